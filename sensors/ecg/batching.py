@@ -0,0 +1,197 @@
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import argparse
+import asyncio
+import collections
+import numpy as np
+import time
+
+import load
+import server
+
+Result = collections.namedtuple(
+    "Result", ["label", "probs", "queue_ms", "batch_size"])
+
+class MicroBatcher(object):
+    """
+    Collects records from concurrent callers into batches for a
+    server.ModelServer. A batch closes once its first record has waited
+    max_delay_ms, or once it holds max_batch_size records or
+    max_batch_samples samples, whichever comes first. Larger limits trade
+    latency for throughput.
+
+    The batch is split into length buckets of at most bucket_samples
+    padded samples (see load.make_token_batches), each bucket is
+    predicted with a single model call off the event loop, and every
+    caller gets back a Result with its label, frame probabilities, the
+    time it spent queued and the size of the batch it rode in.
+
+    Padding lets the last frames of a shorter record see past its end, so
+    they can differ from predicting the record alone. With
+    pad_records=False buckets only group records of equal length and the
+    results match single-record prediction.
+    """
+
+    def __init__(self, model, max_delay_ms=10, max_batch_size=32,
+                 max_batch_samples=288000, bucket_samples=None,
+                 pad_records=True, history=1000):
+        self.model = model
+        self.pad_records = pad_records
+        self.max_delay = max_delay_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.max_batch_samples = max_batch_samples
+        self.bucket_samples = bucket_samples or max_batch_samples
+        self.queue_times = collections.deque(maxlen=history)
+        self._queue = None
+        self._task = None
+        self._batch = [] # Requests taken off the queue but not answered.
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # Requests in the batch being collected or predicted, then the
+        # ones still queued, would otherwise never be answered.
+        for _, future, _ in self._batch:
+            future.cancel()
+        self._batch = []
+        while not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            future.cancel()
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def predict(self, ecg):
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((ecg, future, time.monotonic()))
+        return await future
+
+    async def classify(self, ecg):
+        result = await self.predict(ecg)
+        return result.label
+
+    def queue_time_percentiles(self, percentiles=(50, 95, 99)):
+        """
+        Queueing time percentiles (in ms) over the most recent requests.
+        """
+        if not self.queue_times:
+            return {}
+        values = np.percentile(list(self.queue_times), percentiles)
+        return dict(zip(percentiles, values.tolist()))
+
+    async def _collect(self):
+        item = await self._queue.get()
+        batch = self._batch = [item]
+        samples = len(item[0])
+        deadline = item[2] + self.max_delay
+        while len(batch) < self.max_batch_size and \
+                samples < self.max_batch_samples:
+            # Records that queued up during the last prediction join the
+            # batch even when the first one has already waited too long.
+            if not self._queue.empty():
+                item = self._queue.get_nowait()
+            else:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            batch.append(item)
+            samples += len(item[0])
+        return batch
+
+    def _buckets(self, ecgs):
+        if self.pad_records:
+            return load.make_token_batches(self.bucket_samples, ecgs)
+        buckets = collections.defaultdict(list)
+        for i, ecg in enumerate(ecgs):
+            buckets[len(ecg)].append(i)
+        return list(buckets.values())
+
+    def _predict(self, ecgs):
+        probs = [None] * len(ecgs)
+        for bucket in self._buckets(ecgs):
+            bucket_probs = self.model.predict_proba([ecgs[i] for i in bucket])
+            for i, p in zip(bucket, bucket_probs):
+                probs[i] = p
+        return probs
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            started = time.monotonic()
+            ecgs = [np.asarray(ecg) for ecg, _, _ in batch]
+            try:
+                probs = await loop.run_in_executor(None, self._predict, ecgs)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                self._batch = []
+                continue
+            for (_, future, queued), p in zip(batch, probs):
+                queue_ms = (started - queued) * 1000
+                self.queue_times.append(queue_ms)
+                if not future.done():
+                    future.set_result(Result(self.model.label(p), p,
+                                             queue_ms, len(batch)))
+            self._batch = []
+
+async def _replay(batcher, ecgs, rate):
+    async def request(i, ecg):
+        await asyncio.sleep(i / rate)
+        return await batcher.predict(ecg)
+    async with batcher:
+        return await asyncio.gather(
+            *[request(i, ecg) for i, ecg in enumerate(ecgs)])
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Replay a dataset as concurrent requests through a "
+                    "MicroBatcher and report throughput and queueing time.")
+    parser.add_argument("data_json", help="path to data json")
+    parser.add_argument("model_path", help="path to model")
+    parser.add_argument("--rate", type=float, default=100,
+                        help="requests per second")
+    parser.add_argument("--max_delay_ms", type=float, default=10)
+    parser.add_argument("--max_batch_size", type=int, default=32)
+    parser.add_argument("--max_batch_samples", type=int, default=288000)
+    parser.add_argument("--no_padding", action="store_true",
+                        help="only batch records of equal length")
+    args = parser.parse_args()
+
+    ecgs, _ = load.load_dataset(args.data_json)
+    batcher = MicroBatcher(server.ModelServer(args.model_path),
+                           max_delay_ms=args.max_delay_ms,
+                           max_batch_size=args.max_batch_size,
+                           max_batch_samples=args.max_batch_samples,
+                           pad_records=not args.no_padding)
+    start = time.time()
+    results = asyncio.run(_replay(batcher, ecgs, args.rate))
+    elapsed = time.time() - start
+    print("{} records in {:.2f}s ({:.1f} records/s), mean batch {:.1f}".format(
+        len(results), elapsed, len(results) / elapsed,
+        np.mean([r.batch_size for r in results])))
+    for p, ms in sorted(batcher.queue_time_percentiles().items()):
+        print("queue p{}: {:.1f} ms".format(p, ms))
@@ -0,0 +1,115 @@
+from __future__ import division
+from __future__ import absolute_import
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+import util
+
+# File hashes keyed by path, with the (mtime_ns, size) they were computed at.
+_HASHES = {}
+
+def file_hash(path, chunk_size=1 << 20):
+    """
+    SHA-1 of a file's contents, remembered for the rest of the process
+    until the file changes.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _HASHES.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    sha = hashlib.sha1()
+    with open(path, 'rb') as fid:
+        for block in iter(lambda: fid.read(chunk_size), b''):
+            sha.update(block)
+    _HASHES[path] = (signature, sha.hexdigest())
+    return _HASHES[path][1]
+
+def preproc_hash(preproc):
+    """
+    Hash of everything that affects a preprocessor's output, including
+    the serialization version.
+    """
+    state = json.dumps(util.preproc_to_dict(preproc), sort_keys=True)
+    return hashlib.sha1(state.encode('utf8')).hexdigest()
+
+def entry_key(*parts):
+    return hashlib.sha1("/".join(parts).encode('utf8')).hexdigest()
+
+class PredictionCache(object):
+    """
+    On-disk content-addressed store of arrays, one .npz file per key,
+    bounded to max_bytes by evicting the least recently used entries.
+    Reading an entry refreshes its modification time, which is what the
+    eviction order is based on. Entries are written to a temporary file
+    and renamed into place, so readers never see a partial entry.
+    """
+
+    def __init__(self, cache_dir, max_bytes=1 << 30):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        self._sizes = {}
+        for root, _, files in os.walk(cache_dir):
+            for f in files:
+                if f.endswith(".npz"):
+                    path = os.path.join(root, f)
+                    self._sizes[path] = os.path.getsize(path)
+        self._total = sum(self._sizes.values())
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".npz")
+
+    def get(self, key):
+        """
+        The arrays stored under key as a dict, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as entry:
+                arrays = {name: entry[name] for name in entry.files}
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            return None
+        return arrays
+
+    def put(self, key, **arrays):
+        path = self._path(key)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, 'wb') as fid:
+            np.savez(fid, **arrays)
+        os.rename(tmp_path, path)
+
+        size = os.path.getsize(path)
+        self._total += size - self._sizes.get(path, 0)
+        self._sizes[path] = size
+        if self._total > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """
+        Delete the least recently used entries until the cache fits in
+        max_bytes.
+        """
+        def mtime(path):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return 0
+        for path in sorted(self._sizes, key=mtime):
+            if self._total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._total -= self._sizes.pop(path)
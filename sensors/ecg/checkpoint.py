@@ -0,0 +1,103 @@
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import keras
+import math
+import os
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+class Checkpointer(keras.callbacks.Callback):
+    """
+    Replacement for ModelCheckpoint that keeps the best keep_best models
+    by monitor (lower is better) and the latest one, and deletes the rest.
+
+    At the end of every epoch the weights are copied out of the model,
+    which is all the training thread waits for. A background thread loads
+    them into a copy of the model and writes it with the Keras save API,
+    without the optimizer state; load_model returns these checkpoints
+    uncompiled. At most max_pending snapshots wait to be written, so a
+    slow disk eventually stalls training rather than filling memory.
+    Files are written under a temporary name and renamed into place, so a
+    listed checkpoint is always complete, and older ones are deleted only
+    after the new one is in place. The file name is formatted from
+    filepath like ModelCheckpoint's.
+    """
+
+    def __init__(self, filepath, keep_best=3, monitor="val_loss",
+                 max_pending=1):
+        super(Checkpointer, self).__init__()
+        self.filepath = filepath
+        self.keep_best = keep_best
+        self.monitor = monitor
+        self.saved = [] # (score, epoch, path) of files on disk.
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = None
+        self._copy = None
+
+    def _keep(self):
+        ranked = sorted(self.saved)[:self.keep_best]
+        latest = max(self.saved, key=lambda s: s[1])
+        return set(s[2] for s in ranked) | {latest[2]}
+
+    def _write(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue
+            score, epoch, path, weights = item
+            try:
+                # Dot files are skipped by globs for checkpoints, and the
+                # extension keeps Keras writing HDF5.
+                tmp_path = os.path.join(os.path.dirname(path),
+                                        "." + os.path.basename(path))
+                self._copy.set_weights(weights)
+                self._copy.save(tmp_path, include_optimizer=False)
+                os.rename(tmp_path, path)
+                self.saved = [s for s in self.saved if s[2] != path]
+                self.saved.append((score, epoch, path))
+                keep = self._keep()
+                for s in self.saved:
+                    if s[2] not in keep and os.path.exists(s[2]):
+                        os.remove(s[2])
+                self.saved = [s for s in self.saved if s[2] in keep]
+            except Exception as e:
+                self._error = e
+
+    def _check(self):
+        if self._error is not None:
+            raise self._error
+
+    def on_train_begin(self, logs=None):
+        # Setting the weights once here builds the copy's assign ops on
+        # the training thread.
+        self._copy = keras.models.clone_model(self.model)
+        self._copy.set_weights(self.model.get_weights())
+        self._thread = threading.Thread(target=self._write)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self._check()
+        logs = logs or {}
+        score = logs.get(self.monitor)
+        if score is None or math.isnan(score):
+            score = float("inf")
+        path = self.filepath.format(epoch=epoch + 1, **logs)
+        self._pending.put((score, epoch, path, self.model.get_weights()))
+
+    def on_train_end(self, logs=None):
+        """
+        Wait for pending checkpoints to be written.
+        """
+        self._pending.put(None)
+        self._thread.join()
+        self._check()
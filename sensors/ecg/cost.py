@@ -0,0 +1,208 @@
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import argparse
+import json
+import numpy as np
+import sys
+import time
+
+import load
+import network
+
+SAMPLE_RATE = 300 # Hz, of the CinC 2017 recordings.
+FLOAT_BYTES = 4
+
+def _channels(layer):
+    from keras import backend as K
+    return K.int_shape(layer.output)[-1]
+
+def _frame_flops(class_name, config, in_channels, out_channels):
+    """
+    Floating point operations to compute one output frame of a layer,
+    counting a multiply-add as two.
+    """
+    if class_name == "Conv1D":
+        kernel, _, _ = network.window(config)
+        return 2 * kernel * in_channels * out_channels
+    if class_name == "TimeDistributed":
+        return 2 * in_channels * out_channels
+    if class_name in ("MaxPooling1D", "AveragePooling1D"):
+        kernel, _, _ = network.window(config)
+        return kernel * out_channels
+    if class_name == "BatchNormalization":
+        return 2 * out_channels
+    if class_name in ("Activation", "Add"):
+        return out_channels
+    return 0
+
+def layer_costs(model, sample_rate=SAMPLE_RATE):
+    """
+    Per layer of model: its class, output channels, stride relative to the
+    input, parameter count, forward FLOPs per second of input at
+    sample_rate and activation values per input sample. Strides come from
+    the same config walk as network.receptive_field.
+    """
+    config = model.get_config()
+    jumps = {}
+    costs = []
+    for layer_config in config["layers"]:
+        name = layer_config["name"]
+        class_name = layer_config["class_name"]
+        layer = model.get_layer(name)
+        inbound = [n[0] for node in layer_config["inbound_nodes"]
+                   for n in node]
+        jump = jumps[inbound[0]] if inbound else 1
+        if class_name in ("Conv1D", "MaxPooling1D", "AveragePooling1D"):
+            jump *= network.window(layer_config["config"])[1]
+        jumps[name] = jump
+
+        out_channels = _channels(layer)
+        in_channels = _channels(model.get_layer(inbound[0])) \
+            if inbound else out_channels
+        frame_flops = _frame_flops(class_name, layer_config["config"],
+                                   in_channels, out_channels)
+        costs.append({"name": name,
+                      "class_name": class_name,
+                      "channels": out_channels,
+                      "stride": jump,
+                      "params": layer.count_params(),
+                      "flops_per_second": frame_flops * sample_rate / jump,
+                      "activations_per_sample": out_channels / jump})
+    return costs
+
+def build(params, num_categories=4):
+    params = dict(params, input_shape=[None, 1],
+                  num_categories=num_categories, compile=False)
+    return network.build_network(**params)
+
+def estimate(params, seconds=30, batch_size=None, num_categories=4,
+             sample_rate=SAMPLE_RATE):
+    """
+    Cost of the network described by training params: parameter count,
+    forward GFLOPs per second of ECG, activation memory of a training
+    batch, receptive field and output frame rate, plus the per-layer
+    breakdown. A batch holds batch_max_tokens padded samples if params
+    set it, otherwise batch_size records of the given length in seconds.
+    """
+    model = build(params, num_categories)
+    layers = layer_costs(model, sample_rate)
+    jump, start, end = network.receptive_field(model)
+
+    if params.get("batch_max_tokens"):
+        batch_samples = params["batch_max_tokens"]
+    else:
+        batch_size = batch_size or params.get("batch_size", 32)
+        batch_samples = batch_size * int(seconds * sample_rate)
+    activations = sum(l["activations_per_sample"] for l in layers)
+
+    return {"params": int(sum(l["params"] for l in layers)),
+            "gflops_per_second": sum(l["flops_per_second"]
+                                     for l in layers) / 1e9,
+            "batch_samples": batch_samples,
+            "activation_mb_per_batch":
+                activations * batch_samples * FLOAT_BYTES / (1 << 20),
+            "receptive_field_samples": end - start + 1,
+            "receptive_field_seconds": (end - start + 1) / sample_rate,
+            "output_stride": jump,
+            "output_frames_per_second": sample_rate / jump,
+            "matches_label_step": jump == load.STEP,
+            "layers": layers}
+
+def benchmark(model, lengths, batch_sizes, repeats=5, sample_rate=SAMPLE_RATE):
+    """
+    Median CPU forward latency of model for every combination of input
+    length (seconds, rounded down to whole label steps) and batch size,
+    after a warm-up run of each shape.
+    """
+    results = []
+    for seconds in lengths:
+        samples = int(seconds * sample_rate) // load.STEP * load.STEP
+        for batch_size in batch_sizes:
+            x = np.random.randn(batch_size, samples, 1).astype(np.float32)
+            model.predict(x, batch_size=batch_size)
+            times = []
+            for _ in range(repeats):
+                start = time.time()
+                model.predict(x, batch_size=batch_size)
+                times.append(time.time() - start)
+            latency = float(np.median(times))
+            results.append({"seconds": samples / sample_rate,
+                            "batch_size": batch_size,
+                            "latency_ms": latency * 1000,
+                            "ms_per_ecg_second": latency * 1000 /
+                                (batch_size * samples / sample_rate)})
+    return results
+
+def print_report(report):
+    print("{:<28} {:<20} {:>8} {:>7} {:>10} {:>12}".format(
+        "layer", "class", "channels", "stride", "params", "MFLOPs/s"))
+    for l in report["layers"]:
+        print("{:<28} {:<20} {:>8} {:>7} {:>10} {:>12.2f}".format(
+            l["name"], l["class_name"], l["channels"], l["stride"],
+            l["params"], l["flops_per_second"] / 1e6))
+    print()
+    print("Parameters: {:,}".format(report["params"]))
+    print("Forward GFLOPs per second of ECG: {:.3f}".format(
+        report["gflops_per_second"]))
+    print("Activation memory per batch of {:,} samples: {:.0f} MB".format(
+        report["batch_samples"], report["activation_mb_per_batch"]))
+    print("Receptive field: {} samples ({:.2f} s)".format(
+        report["receptive_field_samples"], report["receptive_field_seconds"]))
+    print("Output frame rate: {:.3f} frames/s (one every {} samples)".format(
+        report["output_frames_per_second"], report["output_stride"]))
+    if not report["matches_label_step"]:
+        print("Warning: output stride {} does not match the label step {}."
+              .format(report["output_stride"], load.STEP))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Estimate the cost of a network config.")
+    parser.add_argument("config_file", help="path to config file")
+    parser.add_argument("--num_categories", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=30,
+                        help="record length for the batch memory estimate")
+    parser.add_argument("--batch_size", type=int, default=None)
+    parser.add_argument("--max_params", type=int, default=None,
+                        help="exit with status 1 above this many parameters")
+    parser.add_argument("--max_gflops", type=float, default=None,
+                        help="exit with status 1 above this many GFLOPs per "
+                             "second of ECG")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="also measure CPU forward latency")
+    parser.add_argument("--lengths", type=float, nargs="+",
+                        default=[10, 30, 60],
+                        help="benchmark record lengths in seconds")
+    parser.add_argument("--batch_sizes", type=int, nargs="+",
+                        default=[1, 8, 32])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", action="store_true",
+                        help="print the report as json")
+    args = parser.parse_args()
+    with open(args.config_file, 'r') as fid:
+        params = json.load(fid)
+
+    report = estimate(params, args.seconds, args.batch_size,
+                      args.num_categories)
+    if args.benchmark:
+        model = build(params, args.num_categories)
+        report["benchmark"] = benchmark(model, args.lengths,
+                                        args.batch_sizes, args.repeats)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+        for b in report.get("benchmark", []):
+            print("{:5.1f} s x {:3d}: {:8.1f} ms ({:.2f} ms per ECG second)"
+                  .format(b["seconds"], b["batch_size"], b["latency_ms"],
+                          b["ms_per_ecg_second"]))
+
+    over = (args.max_params is not None and
+            report["params"] > args.max_params) or \
+        (args.max_gflops is not None and
+         report["gflops_per_second"] > args.max_gflops)
+    if over:
+        print("Over budget.", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,247 @@
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import argparse
+import collections
+import json
+import numpy as np
+import os
+import shutil
+import time
+
+import load
+import network # Saved models' zeropad Lambda needs network loaded.
+import util
+import voting
+
+EXPORT_VERSION = 1
+QUANTIZATIONS = ("float16", "int8")
+
+ARCHITECTURE_FILE = "model.json"
+WEIGHTS_FILE = "weights.npz"
+META_FILE = "export.json"
+
+def _fold_batchnorm(conv, bn):
+    """
+    Weights of a conv layer with the batch norm that follows it folded in.
+    """
+    weights = conv.get_weights()
+    kernel = weights[0]
+    bias = weights[1] if conv.use_bias else np.zeros(kernel.shape[-1])
+
+    bn_weights = list(bn.get_weights())
+    gamma = bn_weights.pop(0) if bn.scale else np.ones(kernel.shape[-1])
+    beta = bn_weights.pop(0) if bn.center else np.zeros(kernel.shape[-1])
+    mean, variance = bn_weights
+
+    scale = gamma / np.sqrt(variance + bn.epsilon)
+    return [(kernel * scale).astype(np.float32),
+            ((bias - mean) * scale + beta).astype(np.float32)]
+
+def _static_zeropad(tensor):
+    """
+    The channel zero-padding of network.resnet_block's shortcut built
+    from standard layers, so the exported graph has no Python code in it.
+    """
+    from keras import backend as K
+    from keras.layers import Permute, ZeroPadding1D
+    channels = K.int_shape(tensor)[-1]
+    tensor = Permute((2, 1))(tensor)
+    tensor = ZeroPadding1D((0, channels))(tensor)
+    return Permute((2, 1))(tensor)
+
+def inference_model(model):
+    """
+    Rebuild a trained model for inference only: batch norms directly
+    after a convolution are folded into its weights, dropout is removed
+    and the shortcut zero-padding Lambda becomes static layers. Other
+    layers are copied with their weights.
+    """
+    from keras.layers import Input
+    from keras.models import Model
+
+    config = model.get_config()
+    layers = {layer.name: layer for layer in model.layers}
+    inbound = collections.OrderedDict(
+        (l["name"], [n[0] for node in l["inbound_nodes"] for n in node])
+        for l in config["layers"])
+    consumers = collections.Counter(
+        name for names in inbound.values() for name in names)
+
+    # Convolutions whose only consumer is a batch norm.
+    folds = {}
+    for name, names in inbound.items():
+        if type(layers[name]).__name__ == "BatchNormalization" and \
+                type(layers[names[0]]).__name__ == "Conv1D" and \
+                consumers[names[0]] == 1:
+            folds[names[0]] = name
+
+    tensors = {}
+    for name, names in inbound.items():
+        layer = layers[name]
+        kind = type(layer).__name__
+        inputs = [tensors[n] for n in names]
+
+        if not inputs:
+            shape = layer.get_config()["batch_input_shape"][1:]
+            tensors[name] = Input(shape=shape, dtype='float32', name=name)
+        elif kind == "Dropout":
+            tensors[name] = inputs[0]
+        elif kind == "BatchNormalization" and names[0] in folds:
+            tensors[name] = inputs[0]
+        elif kind == "Lambda":
+            if getattr(layer.function, "__name__", None) != "zeropad":
+                raise ValueError("Cannot export Lambda layer " + name)
+            tensors[name] = _static_zeropad(inputs[0])
+        else:
+            layer_config = layer.get_config()
+            weights = layer.get_weights()
+            if name in folds:
+                layer_config["use_bias"] = True
+                weights = _fold_batchnorm(layer, layers[folds[name]])
+            clone = type(layer).from_config(layer_config)
+            tensors[name] = clone(inputs if len(inputs) > 1 else inputs[0])
+            clone.set_weights(weights)
+
+    outputs = [tensors[o[0]] for o in config["output_layers"]]
+    return Model(inputs=[tensors[i[0]] for i in config["input_layers"]],
+                 outputs=outputs)
+
+def quantize_weights(weights, quantize=None):
+    """
+    Arrays to store for weights. Kernels (arrays with two or more axes)
+    are stored as float16, or as int8 with one symmetric scale per output
+    channel; everything else stays float32.
+    """
+    arrays = {}
+    for i, w in enumerate(weights):
+        key = "w{}".format(i)
+        if quantize is None or w.ndim < 2:
+            arrays[key] = w.astype(np.float32)
+        elif quantize == "float16":
+            arrays[key] = w.astype(np.float16)
+        elif quantize == "int8":
+            axes = tuple(range(w.ndim - 1))
+            scale = np.abs(w).max(axis=axes) / 127
+            scale[scale == 0] = 1
+            arrays[key] = np.round(w / scale).astype(np.int8)
+            arrays[key + "_scale"] = scale.astype(np.float32)
+        else:
+            raise ValueError("Unknown quantization: {}".format(quantize))
+    return arrays
+
+def dequantize_weights(arrays):
+    weights = []
+    for i in range(len([k for k in arrays if not k.endswith("_scale")])):
+        key = "w{}".format(i)
+        w = arrays[key].astype(np.float32)
+        if key + "_scale" in arrays:
+            w *= arrays[key + "_scale"]
+        weights.append(w)
+    return weights
+
+def save_exported(model, export_dir, quantize=None, report=None):
+    if not os.path.exists(export_dir):
+        os.makedirs(export_dir)
+    with open(os.path.join(export_dir, ARCHITECTURE_FILE), 'w') as fid:
+        fid.write(model.to_json())
+    np.savez(os.path.join(export_dir, WEIGHTS_FILE),
+             **quantize_weights(model.get_weights(), quantize))
+    meta = {"version": EXPORT_VERSION, "quantize": quantize,
+            "report": report}
+    with open(os.path.join(export_dir, META_FILE), 'w') as fid:
+        json.dump(meta, fid, indent=2)
+
+def is_exported(path):
+    return os.path.isdir(path) and \
+        os.path.exists(os.path.join(path, ARCHITECTURE_FILE))
+
+def load_exported(export_dir):
+    """
+    Load an exported model as a Keras model with float32 weights.
+    """
+    from keras.models import model_from_json
+    with open(os.path.join(export_dir, ARCHITECTURE_FILE), 'r') as fid:
+        model = model_from_json(fid.read())
+    with np.load(os.path.join(export_dir, WEIGHTS_FILE)) as arrays:
+        model.set_weights(dequantize_weights(dict(arrays)))
+    return model
+
+def evaluate_export(original, exported, x, y, counts):
+    """
+    Compare frame predictions of the original and exported models on
+    preprocessed data: frame accuracy of each (padding frames excluded),
+    their difference, how often they agree and the largest probability
+    difference, plus the seconds each took to predict x.
+    """
+    mask = voting.frame_mask(counts, y.shape[1])
+    if y.ndim == 3 and y.shape[2] > 1:
+        truth = np.argmax(y, axis=2)
+    else:
+        truth = y.reshape(y.shape[:2])
+
+    results = []
+    for model in (original, exported):
+        start = time.time()
+        probs = model.predict(x)
+        results.append((probs, time.time() - start))
+    (probs, seconds), (exported_probs, exported_seconds) = results
+
+    predicted = np.argmax(probs, axis=2)
+    exported_predicted = np.argmax(exported_probs, axis=2)
+    accuracy = float(np.mean((predicted == truth)[mask]))
+    exported_accuracy = float(np.mean((exported_predicted == truth)[mask]))
+    return {"accuracy": accuracy,
+            "exported_accuracy": exported_accuracy,
+            "accuracy_delta": exported_accuracy - accuracy,
+            "agreement": float(np.mean(
+                (predicted == exported_predicted)[mask])),
+            "max_abs_diff": float(np.abs(probs - exported_probs).max()),
+            "predict_seconds": seconds,
+            "exported_predict_seconds": exported_seconds}
+
+def export(model_path, export_dir, quantize=None, data_json=None):
+    """
+    Write an inference-only copy of the model at model_path (and its
+    preprocessor) to export_dir, optionally with quantized weights. With
+    data_json the export is evaluated against the original on that
+    dataset and the report is saved with it.
+    """
+    import keras
+    original = keras.models.load_model(model_path, compile=False)
+    exported = inference_model(original)
+    if quantize is not None:
+        arrays = quantize_weights(exported.get_weights(), quantize)
+        exported.set_weights(dequantize_weights(arrays))
+
+    preproc_dir = os.path.dirname(os.path.abspath(model_path))
+    report = None
+    if data_json is not None:
+        preproc = util.load(preproc_dir)
+        ecgs, labels = load.load_dataset(data_json)
+        x, y = preproc.process(ecgs, labels)
+        counts = [len(l) for l in labels]
+        report = evaluate_export(original, exported, x, y, counts)
+
+    save_exported(exported, export_dir, quantize, report)
+    for name in (util.PREPROC_FILE, util.LEGACY_PREPROC_FILE):
+        if os.path.exists(os.path.join(preproc_dir, name)):
+            shutil.copy(os.path.join(preproc_dir, name), export_dir)
+    return report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Export a trained model for inference.")
+    parser.add_argument("model_path", help="path to model")
+    parser.add_argument("export_dir", help="directory to write the export to")
+    parser.add_argument("--quantize", choices=QUANTIZATIONS,
+                        help="store kernels with reduced precision")
+    parser.add_argument("--data_json",
+                        help="dataset to compare the export against")
+    args = parser.parse_args()
+    report = export(args.model_path, args.export_dir, args.quantize,
+                    args.data_json)
+    if report is not None:
+        for key, value in sorted(report.items()):
+            print("{}: {:.6f}".format(key, value))
@@ -2,72 +2,259 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 
+import collections
 import json
-import keras
 import numpy as np
 import os
 import random
 import scipy.io as sio
+import time
 import tqdm
 
 STEP = 256
 
-def data_generator(batch_size, preproc, x, y):
-    num_examples = len(x)
-    examples = zip(x, y)
-    examples = sorted(examples, key = lambda x: x[0].shape[0])
-    end = num_examples - batch_size + 1
-    batches = [examples[i:i+batch_size]
-                for i in range(0, end, batch_size)]
+def make_batches(batch_size, x):
+    """
+    Group example indices into batches of similar length; the last
+    partial batch is dropped.
+    """
+    order = sorted(range(len(x)), key=lambda i: x[i].shape[0])
+    end = len(order) - batch_size + 1
+    return [order[i:i+batch_size] for i in range(0, end, batch_size)]
+
+def make_token_batches(max_tokens, x, max_batch_size=None):
+    """
+    Group example indices into batches of similar length holding at most
+    max_tokens samples once padded, so short records are packed into
+    large batches and long ones into small batches. A record longer than
+    max_tokens gets a batch of its own.
+    """
+    order = sorted(range(len(x)), key=lambda i: x[i].shape[0])
+    batches, batch = [], []
+    for i in order:
+        # Sorted order makes x[i] the longest member of the batch.
+        full = (len(batch) + 1) * x[i].shape[0] > max_tokens or \
+            len(batch) == max_batch_size
+        if batch and full:
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+def padding_fraction(batches, x):
+    """
+    Fraction of the padded samples in batches that are padding.
+    """
+    total, padded = 0, 0
+    for batch in batches:
+        lengths = [x[i].shape[0] for i in batch]
+        total += sum(lengths)
+        padded += len(lengths) * max(lengths)
+    return 1 - total / padded if padded else 0.0
+
+def data_generator(batch_size, preproc, x, y, batches=None, stats=None):
+    """
+    Endless generator of preprocessed batches. If stats is given (a
+    profiling.InputStats), the real and padded sample counts and build
+    time of every batch are recorded in it.
+    """
+    if batches is None:
+        batches = make_batches(batch_size, x)
+    batches = list(batches)
     random.shuffle(batches)
     while True:
         for batch in batches:
-            x, y = zip(*batch)
-            yield preproc.process(x, y)
+            start = time.time()
+            bx, by = preproc.process([x[i] for i in batch],
+                                     [y[i] for i in batch])
+            if stats is not None:
+                stats.record(sum(len(x[i]) for i in batch),
+                             bx.shape[0] * bx.shape[1], time.time() - start)
+            yield bx, by
+
+class Preproc(object):
 
-class Preproc:
+    # Instances pickled before sparse targets existed read this default.
+    sparse = False
 
-    def __init__(self, ecg, labels):
-        self.mean, self.std = compute_mean_std(ecg)
-        self.classes = sorted(set(l for label in labels for l in label))
+    def __init__(self, ecg, labels, sparse=False, num_workers=0):
+        mean, std = compute_mean_std(ecg, num_workers)
+        if hasattr(labels, "classes"):
+            classes = labels.classes
+        else:
+            classes = set(l for label in labels for l in label)
+        self._set_stats(mean, std, classes, sparse)
+
+    @classmethod
+    def from_stats(cls, mean, std, classes, sparse=False):
+        """
+        Rebuild a preprocessor from saved statistics (see util.load).
+        """
+        preproc = cls.__new__(cls)
+        preproc._set_stats(mean, std, classes, sparse)
+        return preproc
+
+    def _set_stats(self, mean, std, classes, sparse):
+        self.mean = np.float32(mean)
+        self.std = np.float32(std)
+        self.classes = sorted(classes)
         self.int_to_class = dict( zip(range(len(self.classes)), self.classes))
         self.class_to_int = {c : i for i, c in self.int_to_class.items()}
+        self.sparse = sparse
 
-    def process(self, x, y):
-        return self.process_x(x), self.process_y(y)
+    def encode_labels(self, labels):
+        """
+        Convert per-record label lists (or a store.LabelStore) to integer
+        class arrays once, so batches can be built without a lookup per
+        label. process_y accepts either form.
+        """
+        if hasattr(labels, "codes_at"):
+            lookup = np.array([self.class_to_int[c] for c in labels.classes],
+                              dtype=np.int32)
+            return [lookup[labels.codes_at(i)] for i in range(len(labels))]
+        return [np.array([self.class_to_int[c] for c in s], dtype=np.int32)
+                for s in labels]
 
-    def process_x(self, x):
-        x = pad(x)
-        x = (x - self.mean) / self.std
+    def process(self, x, y, x_out=None, y_out=None):
+        return self.process_x(x, out=x_out), self.process_y(y, out=y_out)
+
+    def process_x(self, x, out=None):
+        x = pad(x, out=out)
+        x -= self.mean
+        x /= self.std
         x = x[:, :, None]
         return x
 
-    def process_y(self, y):
+    def process_y(self, y, out=None):
+        if not all(isinstance(s, np.ndarray) for s in y):
+            y = self.encode_labels(y)
         # TODO, awni, fix hack pad with noise for cinc
-        y = pad([[self.class_to_int[c] for c in s] for s in y], val=3, dtype=np.int32) 
-        y = keras.utils.np_utils.to_categorical(
-                y, num_classes=len(self.classes))
-        return y
-
-def pad(x, val=0, dtype=np.float32):
-    max_len = max(len(i) for i in x)
-    padded = np.full((len(x), max_len), val, dtype=dtype)
-    for e, i in enumerate(x):
-        padded[e, :len(i)] = i
+        if self.sparse:
+            y = pad(y, val=3, dtype=np.int32, out=out)
+            return y[:, :, None]
+        y = pad(y, val=3, dtype=np.int32)
+        num_classes = len(self.classes)
+        if out is None:
+            onehot = np.zeros(y.shape + (num_classes,), dtype=np.float32)
+        else:
+            onehot = out[:y.size * num_classes].reshape(
+                y.shape + (num_classes,))
+            onehot.fill(0)
+        onehot.reshape(-1, num_classes)[np.arange(y.size), y.ravel()] = 1
+        return onehot
+
+def pad(x, val=0, dtype=np.float32, out=None):
+    """
+    Pad the sequences in x to a common length. If out is given, it is a
+    flat buffer of at least len(x) * max_len elements that the padded
+    array is written into (as a contiguous view) instead of allocating.
+    """
+    lengths = np.array([len(i) for i in x])
+    max_len = lengths.max()
+    if out is None:
+        padded = np.full((len(x), max_len), val, dtype=dtype)
+    else:
+        padded = out[:len(x) * max_len].reshape(len(x), max_len)
+        padded.fill(val)
+    # Row-major boolean indexing fills each row's prefix in record order.
+    padded[np.arange(max_len) < lengths[:, None]] = np.concatenate(x)
     return padded
 
-def compute_mean_std(x):
-    x = np.hstack(x)
-    return (np.mean(x).astype(np.float32),
-           np.std(x).astype(np.float32))
+class RunningStats(object):
+    """
+    Single-pass mean and variance over a stream of arrays (Welford's
+    update, applied per array with Chan's pairwise formula). Partial
+    results from separate workers combine with merge.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        if x.size == 0:
+            return self
+        other = RunningStats()
+        other.count = x.size
+        other.mean = float(x.mean())
+        other.m2 = float(np.square(x - other.mean).sum())
+        return self.merge(other)
+
+    def merge(self, other):
+        count = self.count + other.count
+        if count == 0:
+            return self
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+def _records_stats(records):
+    stats = RunningStats()
+    for r in records:
+        stats.update(r)
+    return stats
+
+def compute_mean_std(x, num_workers=0):
+    """
+    Mean and standard deviation over all samples of the records in x (a
+    list, a store.RecordStore or any iterable), computed in one pass
+    without concatenating the records.
+    """
+    if num_workers > 0 and hasattr(x, "__len__"):
+        step = max(1, len(x) // (4 * num_workers))
+        groups = (range(i, min(i + step, len(x)))
+                  for i in range(0, len(x), step))
+        parts = parallel_map(lambda g: _records_stats(x[i] for i in g),
+                             groups, num_workers)
+        stats = RunningStats()
+        for part in parts:
+            stats.merge(part)
+    else:
+        stats = _records_stats(x)
+    return (np.float32(stats.mean), np.float32(stats.std))
+
+def parallel_map(fn, items, num_workers, use_processes=False, prefetch=None):
+    """
+    Like map(fn, items) but runs fn on a thread (or process) pool. Results
+    are yielded in input order and at most prefetch items are in flight.
+    """
+    from concurrent import futures
+    executor_cls = futures.ProcessPoolExecutor if use_processes \
+        else futures.ThreadPoolExecutor
+    prefetch = prefetch or 4 * num_workers
+    with executor_cls(max_workers=num_workers) as executor:
+        pending = collections.deque()
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= prefetch:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
 
-def load_dataset(data_json):
+def load_dataset(data_json, num_workers=0, use_processes=False):
     with open(data_json, 'r') as fid:
         data = [json.loads(l) for l in fid]
-    labels = []; ecgs = []
-    for d in tqdm.tqdm(data):
-        labels.append(d['labels'])
-        ecgs.append(load_ecg(d['ecg']))
+    labels = [d['labels'] for d in data]
+    records = [d['ecg'] for d in data]
+    if num_workers > 0:
+        ecgs = parallel_map(load_ecg, records, num_workers, use_processes)
+    else:
+        ecgs = (load_ecg(r) for r in records)
+    ecgs = list(tqdm.tqdm(ecgs, total=len(records)))
     return ecgs, labels
 
 def load_ecg(record):
@@ -116,10 +116,67 @@ def add_compile(model, **params):
         lr=params["learning_rate"],
         clipnorm=params.get("clipnorm", 1))
 
-    model.compile(loss='categorical_crossentropy',
+    if params.get("sparse_targets", False):
+        loss = 'sparse_categorical_crossentropy'
+    else:
+        loss = 'categorical_crossentropy'
+    model.compile(loss=loss,
                   optimizer=optimizer,
                   metrics=['accuracy'])
 
+def window(config):
+    """
+    Kernel extent, stride and left padding of a Conv1D or MaxPooling1D
+    layer config, for inputs whose length is a multiple of the stride.
+    """
+    def first(v):
+        return v[0] if isinstance(v, (list, tuple)) else v
+    if "pool_size" in config:
+        kernel = first(config["pool_size"])
+        stride = first(config["strides"]) or kernel
+    else:
+        dilation = first(config.get("dilation_rate", 1))
+        kernel = (first(config["kernel_size"]) - 1) * dilation + 1
+        stride = first(config["strides"])
+    if config["padding"] == "same":
+        pad_left = max(kernel - stride, 0) // 2
+    elif config["padding"] == "causal":
+        pad_left = kernel - 1
+    else:
+        pad_left = 0
+    return kernel, stride, pad_left
+
+def receptive_field(model):
+    """
+    Input samples that each output frame of model depends on, as
+    (jump, start, end): frame p sees samples p * jump + start through
+    p * jump + end (inclusive), provided the input length is a multiple of
+    jump. Layers other than convolutions and poolings act per time step.
+    """
+    config = model.get_config()
+    fields = {}
+    for layer in config["layers"]:
+        inbound = [n[0] for node in layer["inbound_nodes"] for n in node]
+        if not inbound:
+            fields[layer["name"]] = (1, 0, 0)
+            continue
+        parents = [fields[name] for name in inbound]
+        jump = parents[0][0]
+        if any(p[0] != jump for p in parents):
+            raise ValueError("Layer {} merges inputs with different strides."
+                             .format(layer["name"]))
+        start = min(p[1] for p in parents)
+        end = max(p[2] for p in parents)
+        if layer["class_name"] in ("Conv1D", "MaxPooling1D",
+                                   "AveragePooling1D"):
+            kernel, stride, pad_left = window(layer["config"])
+            start -= pad_left * jump
+            end += (kernel - 1 - pad_left) * jump
+            jump *= stride
+        fields[layer["name"]] = (jump, start, end)
+    outputs = [fields[o[0]] for o in config["output_layers"]]
+    return outputs[0]
+
 def build_network(**params):
     from keras.models import Model
     from keras.layers import Input
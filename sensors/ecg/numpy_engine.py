@@ -0,0 +1,174 @@
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import h5py
+import json
+import numpy as np
+
+BN_EPSILON = 1e-3
+
+ACTIVATIONS = {
+    "relu": lambda x: np.maximum(x, 0, out=x),
+    "elu": lambda x: np.where(x > 0, x, np.expm1(np.minimum(x, 0))),
+    "tanh": np.tanh,
+    "linear": lambda x: x,
+}
+
+def _suffix(name):
+    base, _, number = name.rpartition("_")
+    return int(number) if base and number.isdigit() else 0
+
+def read_weights(weights_path):
+    """
+    Read the conv, batch norm and dense weights of a Keras HDF5 file
+    (from save_weights or a full saved model), each kind in the order
+    its layers were created.
+    """
+    convs, norms, denses = [], [], []
+    with h5py.File(weights_path, 'r') as f:
+        group = f["model_weights"] if "model_weights" in f else f
+        for name in group.attrs["layer_names"]:
+            name = name.decode('utf8') if isinstance(name, bytes) else name
+            layer = group[name]
+            weights = [np.asarray(layer[w], dtype=np.float32)
+                       for w in layer.attrs["weight_names"]]
+            if not weights:
+                continue
+            if weights[0].ndim == 3:
+                convs.append((name, weights))
+            elif weights[0].ndim == 2:
+                denses.append((name, weights))
+            else:
+                norms.append((name, weights))
+    order = lambda layers: [w for _, w in
+                            sorted(layers, key=lambda l: _suffix(l[0]))]
+    return order(convs), order(norms), order(denses)
+
+def conv1d(x, kernel, bias, stride=1):
+    """
+    'same' padded strided 1D convolution of x (batch, time, channels)
+    computed one kernel tap at a time.
+    """
+    length = x.shape[1]
+    taps = kernel.shape[0]
+    out_len = -(-length // stride)
+    pad = max((out_len - 1) * stride + taps - length, 0)
+    x = np.pad(x, ((0, 0), (pad // 2, pad - pad // 2), (0, 0)),
+               mode='constant')
+    y = np.empty((x.shape[0], out_len, kernel.shape[2]), dtype=np.float32)
+    y[...] = bias
+    end = (out_len - 1) * stride + 1
+    for t in range(taps):
+        y += np.dot(x[:, t:t + end:stride], kernel[t])
+    return y
+
+def max_pool1d(x, pool):
+    if pool == 1:
+        return x
+    out_len = x.shape[1] // pool
+    x = x[:, :out_len * pool]
+    return x.reshape(x.shape[0], out_len, pool, x.shape[2]).max(axis=2)
+
+def softmax(x):
+    x = x - x.max(axis=-1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=-1, keepdims=True)
+    return x
+
+class NumpyModel(object):
+    """
+    Forward pass of the network.build_network architecture in NumPy, for
+    serving without Keras. The architecture comes from the training
+    params (config.json) and the weights from a Keras HDF5 file. Dropout
+    is the identity at inference. predict has the same input and output
+    shapes as the Keras model's.
+    """
+
+    def __init__(self, weights_path, params):
+        self.params = params
+        convs, norms, denses = read_weights(weights_path)
+        self._convs = convs
+        # Fold each batch norm into a per-channel scale and shift.
+        self._norms = []
+        for gamma, beta, mean, variance in norms:
+            scale = gamma / np.sqrt(variance + BN_EPSILON)
+            self._norms.append((scale, beta - mean * scale))
+        self._dense = denses[-1]
+        self._activation = ACTIVATIONS[params.get("conv_activation", "relu")]
+
+    @classmethod
+    def from_config(cls, weights_path, config_file):
+        with open(config_file, 'r') as fid:
+            return cls(weights_path, json.load(fid))
+
+    def _bn_relu(self, x, norms):
+        scale, shift = next(norms)
+        x = x * scale
+        x += shift
+        return self._activation(x)
+
+    def _resnet(self, x, convs, norms):
+        params = self.params
+        x = self._bn_relu(conv1d(x, *next(convs)), norms)
+        for index, subsample in enumerate(params["conv_subsample_lengths"]):
+            shortcut = max_pool1d(x, subsample)
+            if index % params["conv_increase_channels_at"] == 0 and index > 0:
+                shortcut = np.concatenate(
+                    [shortcut, np.zeros_like(shortcut)], axis=2)
+            for i in range(params["conv_num_skip"]):
+                if not (index == 0 and i == 0):
+                    x = self._bn_relu(x, norms)
+                x = conv1d(x, *next(convs),
+                           stride=subsample if i == 0 else 1)
+            x = shortcut + x
+        return self._bn_relu(x, norms)
+
+    def _regular(self, x, convs, norms):
+        for subsample in self.params["conv_subsample_lengths"]:
+            x = conv1d(x, *next(convs), stride=subsample)
+            x = self._bn_relu(x, norms)
+        return x
+
+    def receptive_field(self):
+        """
+        (jump, start, end) as network.receptive_field computes for the
+        equivalent Keras model, walking the same layers as predict.
+        """
+        params = self.params
+        taps = params["conv_filter_length"]
+
+        def conv(field, stride):
+            # TF 'same' padding for inputs that are a multiple of stride.
+            jump, start, end = field
+            pad_left = max(taps - stride, 0) // 2
+            return (jump * stride, start - pad_left * jump,
+                    end + (taps - 1 - pad_left) * jump)
+
+        field = (1, 0, 0)
+        if params.get("is_regular_conv", False):
+            for subsample in params["conv_subsample_lengths"]:
+                field = conv(field, subsample)
+            return field
+
+        field = conv(field, 1)
+        for subsample in params["conv_subsample_lengths"]:
+            jump, start, end = field
+            shortcut = (jump * subsample, start,
+                        end + (subsample - 1) * jump)
+            for i in range(params["conv_num_skip"]):
+                field = conv(field, subsample if i == 0 else 1)
+            field = (field[0], min(field[1], shortcut[1]),
+                     max(field[2], shortcut[2]))
+        return field
+
+    def predict(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        # Layers consume their weights in the order they were created.
+        convs, norms = iter(self._convs), iter(self._norms)
+        if self.params.get("is_regular_conv", False):
+            x = self._regular(x, convs, norms)
+        else:
+            x = self._resnet(x, convs, norms)
+        kernel, bias = self._dense
+        return softmax(np.dot(x, kernel) + bias)
@@ -0,0 +1,140 @@
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import numpy as np
+import random
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+import load
+
+class BatchPipeline(object):
+    """
+    Endless batch generator that preprocesses batches ahead of time on
+    background threads, for use with model.fit_generator.
+
+    Workers pad, normalize and encode targets into a fixed pool of
+    preallocated buffers and hand finished batches over through a queue
+    of at most queue_depth batches. A buffer goes back to the pool when
+    the next batch is requested, so the consumer must be done with a
+    batch by then: pass workers=0 to fit_generator so Keras consumes the
+    pipeline synchronously instead of queueing batches of its own.
+
+    Batches are formed like load.data_generator (sorted by length, order
+    shuffled once); with several workers they may be delivered slightly
+    out of that order. If stats is given (a profiling.InputStats), each
+    batch's sample counts and build time are recorded as it is delivered.
+    """
+
+    def __init__(self, batch_size, preproc, x, y, num_workers=2,
+                 queue_depth=4, batches=None, stats=None):
+        self.preproc = preproc
+        self.stats = stats
+        self.x = x
+        self.y = y
+        self.batches = list(batches) if batches is not None \
+            else load.make_batches(batch_size, x)
+        random.shuffle(self.batches)
+        if not self.batches:
+            raise ValueError("Not enough examples for a single batch.")
+
+        x_size = max(len(b) * max(len(x[i]) for i in b) for b in self.batches)
+        y_size = max(len(b) * max(len(y[i]) for i in b) for b in self.batches)
+        if preproc.sparse:
+            y_dtype = np.int32
+        else:
+            y_dtype = np.float32
+            y_size *= len(preproc.classes)
+
+        self._free = queue.Queue()
+        for _ in range(queue_depth + num_workers + 1):
+            self._free.put((np.empty(x_size, dtype=np.float32),
+                            np.empty(y_size, dtype=y_dtype)))
+        self._tasks = queue.Queue(maxsize=queue_depth + num_workers)
+        self._ready = queue.Queue(maxsize=queue_depth)
+        self._in_use = None
+        self._stop = threading.Event()
+
+        self._threads = [threading.Thread(target=self._schedule)]
+        self._threads += [threading.Thread(target=self._work)
+                          for _ in range(num_workers)]
+        for t in self._threads:
+            t.daemon = True
+            t.start()
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return None
+
+    def _schedule(self):
+        while True:
+            for batch in self.batches:
+                if not self._put(self._tasks, batch):
+                    return
+
+    def _work(self):
+        while True:
+            batch = self._get(self._tasks)
+            if batch is None:
+                return
+            buffers = self._get(self._free)
+            if buffers is None:
+                return
+            try:
+                start = time.time()
+                x_buf, y_buf = buffers
+                result = self.preproc.process(
+                    [self.x[i] for i in batch], [self.y[i] for i in batch],
+                    x_out=x_buf, y_out=y_buf)
+                real = sum(len(self.x[i]) for i in batch)
+                item = (result, buffers, (real, result[0].shape[0] *
+                        result[0].shape[1], time.time() - start))
+            except Exception as e:
+                self._free.put(buffers)
+                item = (e, None, None)
+            if not self._put(self._ready, item):
+                return
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._in_use is not None:
+            self._free.put(self._in_use)
+            self._in_use = None
+        result = self._get(self._ready)
+        if result is None:
+            raise StopIteration
+        batch, buffers, batch_stats = result
+        if isinstance(batch, Exception):
+            raise batch
+        self._in_use = buffers
+        if self.stats is not None:
+            self.stats.record(*batch_stats)
+        return batch
+
+    next = __next__
+
+    def close(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join()
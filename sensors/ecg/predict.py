@@ -1,26 +1,138 @@
 from __future__ import print_function
 
 import argparse
+import collections
+import json
 import numpy as np
 import keras
 import os
 
+import cache
 import load
 import util
+import voting
 
-def predict(data_json, model_path):
+def predict_batch(data_json, model_path, load_workers=0, cache_dir=None,
+                  cache_max_bytes=1 << 30):
+    """
+    Frame probabilities for every record in data_json, with the number of
+    frames that belong to each record and the preprocessor used. With
+    cache_dir, see predict_cached.
+    """
+    if cache_dir is not None:
+        return predict_cached(data_json, model_path, cache_dir,
+                              cache_max_bytes, load_workers)
     preproc = util.load(os.path.dirname(model_path))
-    dataset = load.load_dataset(data_json)
+    dataset = load.load_dataset(data_json, num_workers=load_workers)
     x, y = preproc.process(*dataset)
 
-    model = keras.models.load_model(model_path)
+    model = keras.models.load_model(model_path, compile=False)
     probs = model.predict(x, verbose=1)
 
-    return probs
+    step = x.shape[1] // probs.shape[1]
+    counts = voting.frame_counts([len(ecg) for ecg in dataset[0]], step)
+    return probs, counts, preproc
+
+def predict_cached(data_json, model_path, cache_dir, max_bytes=1 << 30,
+                   load_workers=0):
+    """
+    Like predict_batch, but every record's normalized samples and frame
+    probabilities are kept in a cache.PredictionCache under cache_dir,
+    keyed by the hashes of the record file, the preprocessor and the model
+    file. Only records missing from the cache are decoded and predicted,
+    and the model is loaded only if there are any.
+
+    Records are predicted in groups of equal length, so each record's
+    probabilities do not depend on which other records were run with it.
+    Frames past a record's end are zero in the returned array.
+    """
+    preproc = util.load(os.path.dirname(model_path))
+    with open(data_json, 'r') as fid:
+        records = [json.loads(l)['ecg'] for l in fid]
+    if not records:
+        return (np.zeros((0, 0, len(preproc.classes)), dtype=np.float32),
+                np.zeros(0, dtype=int), preproc)
+
+    store = cache.PredictionCache(cache_dir, max_bytes)
+    preproc_key = cache.preproc_hash(preproc)
+    model_key = cache.file_hash(model_path)
+    record_keys = [cache.file_hash(r) for r in records]
+
+    probs = [None] * len(records)
+    missing = []
+    for i, record_key in enumerate(record_keys):
+        entry = store.get(cache.entry_key(record_key, preproc_key, model_key))
+        if entry is None:
+            missing.append(i)
+        else:
+            probs[i] = entry["probs"]
+
+    if missing:
+        features = {}
+        to_decode = []
+        for i in missing:
+            entry = store.get(cache.entry_key(record_keys[i], preproc_key))
+            if entry is None:
+                to_decode.append(i)
+            else:
+                features[i] = entry["x"]
+        paths = [records[i] for i in to_decode]
+        if load_workers > 0:
+            ecgs = load.parallel_map(load.load_ecg, paths, load_workers)
+        else:
+            ecgs = (load.load_ecg(p) for p in paths)
+        for i, ecg in zip(to_decode, ecgs):
+            features[i] = preproc.process_x([ecg])[0, :, 0]
+            store.put(cache.entry_key(record_keys[i], preproc_key),
+                      x=features[i])
+
+        model = keras.models.load_model(model_path, compile=False)
+        by_length = collections.defaultdict(list)
+        for i in missing:
+            by_length[len(features[i])].append(i)
+        for group in by_length.values():
+            x = np.stack([features[i] for i in group])[:, :, None]
+            for i, p in zip(group, model.predict(x)):
+                probs[i] = p
+                store.put(cache.entry_key(record_keys[i], preproc_key,
+                                          model_key), probs=p)
+
+    counts = np.array([len(p) for p in probs])
+    batch = np.zeros((len(probs), counts.max(), probs[0].shape[1]),
+                     dtype=np.float32)
+    for b, p in zip(batch, probs):
+        b[:len(p)] = p
+    return batch, counts, preproc
+
+def predict(data_json, model_path, load_workers=0, cache_dir=None):
+    return predict_batch(data_json, model_path, load_workers, cache_dir)[0]
+
+def predict_records(data_json, model_path, method="majority", load_workers=0,
+                    cache_dir=None):
+    """
+    Record-level labels for data_json, voted over each record's frames.
+    """
+    probs, counts, preproc = predict_batch(data_json, model_path, load_workers,
+                                           cache_dir)
+    return [preproc.int_to_class[int(i)]
+            for i in voting.vote(probs, counts, method)]
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument("data_json", help="path to data json")
     parser.add_argument("model_path", help="path to model")
+    parser.add_argument("--load_workers", type=int, default=0,
+                        help="threads used to decode records (0 = serial)")
+    parser.add_argument("--voting", choices=voting.VOTING_METHODS,
+                        help="print record labels voted with this method")
+    parser.add_argument("--cache_dir",
+                        help="reuse features and predictions cached here")
     args = parser.parse_args()
-    probs = predict(args.data_json, args.model_path)
+    if args.voting:
+        for label in predict_records(args.data_json, args.model_path,
+                                     args.voting, args.load_workers,
+                                     args.cache_dir):
+            print(label)
+    else:
+        probs = predict(args.data_json, args.model_path, args.load_workers,
+                        args.cache_dir)
@@ -0,0 +1,168 @@
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import collections
+import contextlib
+import json
+import keras
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+PROFILE_FILE = "profile.jsonl"
+SUMMARY_FILE = "profile_summary.json"
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process in MB, or None where the
+    resource module is unavailable.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+class InputStats(object):
+    """
+    Batches produced by a batch generator, in the order they are handed
+    to the model: real and padded sample counts and the seconds spent
+    building each batch. Generators record, the profiler pops.
+    """
+
+    def __init__(self):
+        self._batches = collections.deque()
+        self._lock = threading.Lock()
+
+    def record(self, real_samples, padded_samples, seconds):
+        with self._lock:
+            self._batches.append((real_samples, padded_samples, seconds))
+
+    def pop(self):
+        with self._lock:
+            if self._batches:
+                return self._batches.popleft()
+        return None, None, None
+
+class TrainingProfiler(keras.callbacks.Callback):
+    """
+    Keras callback that logs where training time goes. For every batch it
+    records the time the model waited for data (from the end of the
+    previous batch to the start of this one), the step time, throughput,
+    padded and real samples (from input_stats, filled by the batch
+    generator) and the peak RSS. Setup phases timed with phase() are
+    logged too. Everything goes to profile.jsonl in the log directory,
+    and a summary is printed and saved to profile_summary.json when
+    training ends.
+    """
+
+    def __init__(self):
+        super(TrainingProfiler, self).__init__()
+        self.input_stats = InputStats()
+        self.phases = collections.OrderedDict()
+        self.log_dir = None
+        self._log = None
+        self._totals = collections.Counter()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.time()
+        yield
+        self.phases[name] = self.phases.get(name, 0) + time.time() - start
+
+    def log_to(self, log_dir):
+        self.log_dir = log_dir
+        self._log = open(os.path.join(log_dir, PROFILE_FILE), 'a')
+        for name, seconds in self.phases.items():
+            self._write({"type": "phase", "name": name, "seconds": seconds})
+
+    def _write(self, row):
+        if self._log is not None:
+            self._log.write(json.dumps(row) + "\n")
+
+    def on_train_begin(self, logs=None):
+        self._train_start = time.time()
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch = epoch
+        self._epoch_start = time.time()
+        self._batch_end = self._epoch_start
+        self._epoch_totals = collections.Counter()
+
+    def on_batch_begin(self, batch, logs=None):
+        self._batch_start = time.time()
+
+    def on_batch_end(self, batch, logs=None):
+        now = time.time()
+        wait = self._batch_start - self._batch_end
+        step = now - self._batch_start
+        self._batch_end = now
+
+        real, padded, build = self.input_stats.pop()
+        row = {"type": "batch", "epoch": self._epoch, "batch": batch,
+               "data_wait_s": wait, "step_s": step,
+               "size": (logs or {}).get("size"),
+               "real_samples": real, "padded_samples": padded,
+               "build_s": build, "peak_rss_mb": peak_rss_mb()}
+        if padded is not None:
+            row["samples_per_s"] = padded / (wait + step)
+            row["real_samples_per_s"] = real / (wait + step)
+        self._write(row)
+
+        totals = {"batches": 1, "data_wait_s": wait, "step_s": step,
+                  "real_samples": real or 0, "padded_samples": padded or 0}
+        self._epoch_totals.update(totals)
+        self._totals.update(totals)
+
+    def _summary(self, totals, seconds):
+        padded = totals["padded_samples"]
+        busy = totals["data_wait_s"] + totals["step_s"]
+        return {"seconds": seconds,
+                "batches": totals["batches"],
+                "data_wait_s": totals["data_wait_s"],
+                "step_s": totals["step_s"],
+                "data_wait_fraction":
+                    totals["data_wait_s"] / busy if busy else 0.0,
+                "real_samples_per_s":
+                    totals["real_samples"] / busy if busy else 0.0,
+                "padding_fraction":
+                    1 - totals["real_samples"] / padded if padded else 0.0,
+                "peak_rss_mb": peak_rss_mb()}
+
+    def on_epoch_end(self, epoch, logs=None):
+        summary = self._summary(self._epoch_totals,
+                                time.time() - self._epoch_start)
+        summary.update({"type": "epoch", "epoch": epoch})
+        self._write(summary)
+        if self._log is not None:
+            self._log.flush()
+
+    def on_train_end(self, logs=None):
+        summary = self._summary(self._totals, time.time() - self._train_start)
+        summary["phases"] = self.phases
+        if self.log_dir is not None:
+            with open(os.path.join(self.log_dir, SUMMARY_FILE), 'w') as fid:
+                json.dump(summary, fid, indent=2)
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+        print("Profile:")
+        for name, seconds in self.phases.items():
+            print("  {}: {:.1f}s".format(name, seconds))
+        print("  training: {:.1f}s over {} batches".format(
+            summary["seconds"], summary["batches"]))
+        print("  waiting for data: {:.1f}s ({:.0%})".format(
+            summary["data_wait_s"], summary["data_wait_fraction"]))
+        print("  model steps: {:.1f}s".format(summary["step_s"]))
+        print("  real samples/s: {:.0f}, padding {:.1%}".format(
+            summary["real_samples_per_s"], summary["padding_fraction"]))
+        if summary["peak_rss_mb"] is not None:
+            print("  peak RSS: {:.0f} MB".format(summary["peak_rss_mb"]))
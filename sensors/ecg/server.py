@@ -0,0 +1,191 @@
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import argparse
+import json
+import numpy as np
+import os
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import UnixStreamServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import UnixStreamServer
+
+import load
+import util
+import voting
+
+class ModelServer(object):
+    """
+    Keeps a trained model and its preprocessor loaded so records can be
+    classified without rebuilding the network each time.
+
+    model_path is a full Keras model (as saved by train.py), a directory
+    written by export.py or, with config_file, a weights-only file for
+    the network described by that config. The preprocessor is read from
+    preproc_dir, which defaults to the model's directory.
+
+    With engine="numpy" the network runs on numpy_engine.NumpyModel
+    instead of Keras, which is then never imported; this needs
+    config_file.
+    """
+
+    def __init__(self, model_path, preproc_dir=None, config_file=None,
+                 engine="keras"):
+        exported = os.path.isdir(model_path)
+        if preproc_dir is None:
+            preproc_dir = model_path if exported \
+                else os.path.dirname(os.path.abspath(model_path))
+        self.preproc = util.load(preproc_dir)
+        self._lock = threading.Lock()
+        if engine == "numpy":
+            if config_file is None:
+                raise ValueError("The numpy engine needs a config file.")
+            import numpy_engine
+            self.model = numpy_engine.NumpyModel.from_config(
+                model_path, config_file)
+            return
+
+        import keras
+        import network
+        if exported:
+            import export
+            self.model = export.load_exported(model_path)
+        elif config_file is not None:
+            with open(config_file, 'r') as fid:
+                params = json.load(fid)
+            params.update({
+                "compile" : False,
+                "input_shape": [None, 1],
+                "num_categories": len(self.preproc.classes)
+            })
+            self.model = network.build_network(**params)
+            self.model.load_weights(model_path)
+        else:
+            self.model = keras.models.load_model(model_path, compile=False)
+
+    def receptive_field(self):
+        """
+        Input samples each output frame depends on, as (jump, start, end);
+        see network.receptive_field.
+        """
+        if hasattr(self.model, "receptive_field"):
+            return self.model.receptive_field()
+        import network
+        return network.receptive_field(self.model)
+
+    def predict_batch(self, ecgs):
+        """
+        Predict ecgs as one padded batch. Returns the (records, frames,
+        classes) probabilities and the number of frames of each record.
+        """
+        x = self.preproc.process_x(ecgs)
+        with self._lock:
+            probs = self.model.predict(x)
+        step = x.shape[1] // probs.shape[1]
+        return probs, voting.frame_counts([len(ecg) for ecg in ecgs], step)
+
+    def predict_proba(self, ecgs):
+        """
+        Frame-level class probabilities for each record in ecgs, as a list
+        of (frames, classes) arrays without the padding frames.
+        """
+        probs, counts = self.predict_batch(ecgs)
+        return [p[:c] for p, c in zip(probs, counts)]
+
+    def label(self, probs, method="majority"):
+        """
+        The record label voted from one record's frame probabilities.
+        """
+        index = voting.vote(np.asarray(probs)[None], method=method)[0]
+        return self.preproc.int_to_class[int(index)]
+
+    def classify(self, ecgs, method="majority"):
+        """
+        Record labels for ecgs, voted from their frames with method (see
+        voting.VOTING_METHODS).
+        """
+        probs, counts = self.predict_batch(ecgs)
+        return [self.preproc.int_to_class[int(i)]
+                for i in voting.vote(probs, counts, method)]
+
+    def classify_records(self, records):
+        return self.classify([load.load_ecg(r) for r in records])
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        """
+        Classify the records in a JSON body of the form
+        {"records": [<path>, ...]} or {"ecgs": [[<sample>, ...], ...]}.
+        """
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length).decode('utf-8'))
+            if "records" in request:
+                labels = self.server.model.classify_records(request["records"])
+            else:
+                ecgs = [np.asarray(e, dtype=np.int16) for e in request["ecgs"]]
+                labels = self.server.model.classify(ecgs)
+            self._reply(200, {"labels": labels})
+        except Exception as e:
+            self._reply(400, {"error": str(e)})
+
+    def _reply(self, status, body):
+        body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix socket clients have no address.
+        return str(self.client_address or "local")
+
+    def log_message(self, format, *args):
+        pass
+
+class _UnixHTTPServer(UnixStreamServer):
+
+    def server_bind(self):
+        UnixStreamServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+def make_http_server(model, port=None, host="127.0.0.1", unix_socket=None):
+    """
+    HTTP endpoint for model (a ModelServer) on a local TCP port or a Unix
+    socket path. Call serve_forever() on the result to start serving.
+    """
+    if unix_socket is not None:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        httpd = _UnixHTTPServer(unix_socket, _Handler)
+    else:
+        httpd = HTTPServer((host, port), _Handler)
+    httpd.model = model
+    return httpd
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model_path", help="path to model")
+    parser.add_argument("--config_file",
+                        help="network config when model_path holds weights only")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--unix_socket",
+                        help="serve on this Unix socket instead of a port")
+    parser.add_argument("--engine", choices=("keras", "numpy"),
+                        default="keras",
+                        help="run the network on Keras or on plain NumPy")
+    args = parser.parse_args()
+    model = ModelServer(args.model_path, config_file=args.config_file,
+                        engine=args.engine)
+    httpd = make_http_server(model, port=args.port,
+                             unix_socket=args.unix_socket)
+    print("Serving on " + (args.unix_socket or "port " + str(args.port)))
+    httpd.serve_forever()
@@ -0,0 +1,184 @@
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import json
+import numpy as np
+import os
+import shutil
+import tempfile
+import tqdm
+
+import load
+
+STORE_VERSION = 2
+
+ECG_FILE = "ecg.int16"
+OFFSETS_FILE = "offsets.npy"
+LABELS_FILE = "labels.npy"
+LABEL_OFFSETS_FILE = "label_offsets.npy"
+META_FILE = "meta.json"
+
+def default_store_dir(data_json):
+    return os.path.splitext(data_json)[0] + ".store"
+
+def _source_signature(data_json):
+    stat = os.stat(data_json)
+    return {"path": os.path.abspath(data_json),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size}
+
+def _record_signatures(records):
+    signatures = []
+    for record in records:
+        stat = os.stat(record)
+        signatures.append([stat.st_mtime_ns, stat.st_size])
+    return signatures
+
+def build_store(data_json, store_dir=None, num_workers=0):
+    """
+    Decode every record in data_json once and pack the dataset into
+    store_dir: all samples in one flat int16 file, an offsets index and
+    the labels as class codes with their own offsets index. The (mtime,
+    size) of data_json and of every record file are kept, so the store
+    is rebuilt when any of them changes (see is_current). With
+    num_workers > 0 records are decoded on a thread pool while the
+    previous ones are written.
+    """
+    store_dir = store_dir or default_store_dir(data_json)
+    with open(data_json, 'r') as fid:
+        data = [json.loads(l) for l in fid]
+    classes = sorted(set(l for d in data for l in d['labels']))
+    class_to_int = {c : i for i, c in enumerate(classes)}
+
+    parent = os.path.dirname(os.path.abspath(store_dir))
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".store-")
+    try:
+        offsets = np.zeros(len(data) + 1, dtype=np.int64)
+        label_offsets = np.zeros(len(data) + 1, dtype=np.int64)
+        labels = []
+        records = [d['ecg'] for d in data]
+        if num_workers > 0:
+            ecgs = load.parallel_map(load.load_ecg, records, num_workers)
+        else:
+            ecgs = (load.load_ecg(r) for r in records)
+        with open(os.path.join(tmp_dir, ECG_FILE), 'wb') as fid:
+            for e, (d, ecg) in enumerate(tqdm.tqdm(zip(data, ecgs),
+                                                   total=len(data))):
+                ecg16 = np.asarray(ecg, dtype=np.int16)
+                if not np.array_equal(ecg16, ecg):
+                    raise ValueError(
+                        "Record {} does not fit in int16.".format(d['ecg']))
+                ecg16.tofile(fid)
+                offsets[e + 1] = offsets[e] + len(ecg16)
+                labels.extend(class_to_int[c] for c in d['labels'])
+                label_offsets[e + 1] = len(labels)
+
+        np.save(os.path.join(tmp_dir, OFFSETS_FILE), offsets)
+        np.save(os.path.join(tmp_dir, LABELS_FILE),
+                np.array(labels, dtype=np.int16))
+        np.save(os.path.join(tmp_dir, LABEL_OFFSETS_FILE), label_offsets)
+        meta = {"version": STORE_VERSION,
+                "source": _source_signature(data_json),
+                "classes": classes,
+                "records": records,
+                "record_signatures": _record_signatures(records)}
+        with open(os.path.join(tmp_dir, META_FILE), 'w') as fid:
+            json.dump(meta, fid)
+
+        if os.path.exists(store_dir):
+            shutil.rmtree(store_dir)
+        os.rename(tmp_dir, store_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return store_dir
+
+def is_current(data_json, store_dir):
+    meta_f = os.path.join(store_dir, META_FILE)
+    if not os.path.exists(meta_f):
+        return False
+    with open(meta_f, 'r') as fid:
+        meta = json.load(fid)
+    if meta.get("version") != STORE_VERSION or \
+            meta.get("source") != _source_signature(data_json):
+        return False
+    try:
+        return meta["record_signatures"] == \
+            _record_signatures(meta["records"])
+    except OSError:
+        return False
+
+class RecordStore(object):
+    """
+    Read-only sequence of ECG records backed by a memory-mapped store.
+    Indexing returns int16 views into the mapped file, so nothing is read
+    from disk until the samples are used.
+    """
+
+    def __init__(self, store_dir):
+        with open(os.path.join(store_dir, META_FILE), 'r') as fid:
+            self.meta = json.load(fid)
+        self.offsets = np.load(os.path.join(store_dir, OFFSETS_FILE))
+        num_samples = int(self.offsets[-1])
+        if num_samples > 0:
+            self.ecg = np.memmap(os.path.join(store_dir, ECG_FILE),
+                                 dtype=np.int16, mode='r',
+                                 shape=(num_samples,))
+        else:
+            self.ecg = np.zeros(0, dtype=np.int16)
+        self.lengths = np.diff(self.offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("record index out of range")
+        return self.ecg[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+class LabelStore(object):
+    """
+    Read-only sequence of per-record label lists stored as class codes.
+    """
+
+    def __init__(self, store_dir):
+        with open(os.path.join(store_dir, META_FILE), 'r') as fid:
+            self.classes = json.load(fid)["classes"]
+        self.codes = np.load(os.path.join(store_dir, LABELS_FILE),
+                             mmap_mode='r')
+        self.offsets = np.load(os.path.join(store_dir, LABEL_OFFSETS_FILE))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def codes_at(self, i):
+        return self.codes[self.offsets[i]:self.offsets[i + 1]]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("record index out of range")
+        return [self.classes[c] for c in self.codes_at(i)]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+def load_dataset(data_json, store_dir=None, num_workers=0):
+    """
+    Drop-in replacement for load.load_dataset that builds the store on
+    first use (or when data_json changes) and then opens it lazily.
+    """
+    store_dir = store_dir or default_store_dir(data_json)
+    if not is_current(data_json, store_dir):
+        print("Building record store in " + store_dir + "...")
+        build_store(data_json, store_dir, num_workers)
+    return RecordStore(store_dir), LabelStore(store_dir)
@@ -0,0 +1,139 @@
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import argparse
+import itertools
+import numpy as np
+
+import load
+import server
+
+class StreamingPredictor(object):
+    """
+    Frame predictions for a recording that arrives in pieces, computed on
+    bounded windows but identical to predicting the whole record at once.
+
+    A frame is predicted as soon as every sample in its receptive field
+    has arrived. Each window covers up to chunk_frames frames plus the
+    receptive field overlap on both sides and starts on a frame boundary,
+    so every layer sees the same values and padding as in whole-record
+    inference. Samples no longer needed by any pending frame are dropped,
+    so memory stays bounded however long the recording is.
+    """
+
+    def __init__(self, model_server, chunk_frames=256):
+        self.server = model_server
+        self.jump, self.start, self.end = model_server.receptive_field()
+        if load.STEP % self.jump != 0:
+            raise ValueError("Model stride {} does not divide the record "
+                             "step {}.".format(self.jump, load.STEP))
+        self.chunk_frames = chunk_frames
+        self.reset()
+
+    def reset(self):
+        self._buffer = np.zeros(0, dtype=np.int16)
+        self._offset = 0
+        self._received = 0
+        self.frames_emitted = 0
+
+    def push(self, samples):
+        """
+        Add samples to the stream and return the probabilities of the
+        frames that became final, as a (frames, classes) array.
+        """
+        self._buffer = np.concatenate([self._buffer, np.asarray(samples)])
+        self._received += len(samples)
+        # Records are cut to a multiple of STEP (see load.load_ecg), so
+        # only frames inside the last complete step can be final.
+        available = self._received - self._received % load.STEP
+        num_frames = max(0, (available - 1 - self.end) // self.jump + 1)
+        return self._emit(num_frames, available)
+
+    def flush(self):
+        """
+        End the record and return the probabilities of its remaining
+        frames. The predictor is then ready for a new record.
+        """
+        end = self._received - self._received % load.STEP
+        probs = self._emit(end // self.jump, end)
+        self.reset()
+        return probs
+
+    def labels(self, probs):
+        int_to_class = self.server.preproc.int_to_class
+        return [int_to_class[i] for i in np.argmax(probs, axis=1)]
+
+    def _emit(self, num_frames, limit):
+        chunks = []
+        while self.frames_emitted < num_frames:
+            first = self.frames_emitted
+            last = min(num_frames, first + self.chunk_frames)
+            lo = max(0, first * self.jump + self.start)
+            lo -= lo % self.jump
+            hi = (last - 1) * self.jump + self.end + 1
+            hi = min(limit, hi + (-hi) % self.jump)
+            window = self._buffer[lo - self._offset:hi - self._offset]
+            probs = self.server.predict_proba([window])[0]
+            chunks.append(probs[first - lo // self.jump:
+                                last - lo // self.jump])
+            self.frames_emitted = last
+
+        keep = max(0, self.frames_emitted * self.jump + self.start)
+        keep -= keep % self.jump
+        if keep > self._offset:
+            self._buffer = self._buffer[keep - self._offset:]
+            self._offset = keep
+
+        if chunks:
+            return np.concatenate(chunks)
+        return np.zeros((0, len(self.server.preproc.classes)),
+                        dtype=np.float32)
+
+def stream_labels(predictor, sample_chunks):
+    """
+    Yield (frame index, label) for every frame of a record given as an
+    iterable of sample arrays, as soon as each frame is final.
+    """
+    frame = 0
+    for samples in itertools.chain(sample_chunks, [None]):
+        if samples is None:
+            probs = predictor.flush()
+        else:
+            probs = predictor.push(samples)
+        for label in predictor.labels(probs):
+            yield frame, label
+            frame += 1
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Print rhythm labels for a long record as they become "
+                    "available, feeding it in pieces.")
+    parser.add_argument("record", help="path to record")
+    parser.add_argument("model_path", help="path to model")
+    parser.add_argument("--chunk_samples", type=int, default=load.STEP * 64,
+                        help="samples fed to the predictor at a time")
+    parser.add_argument("--chunk_frames", type=int, default=256,
+                        help="most frames predicted per window")
+    parser.add_argument("--config_file",
+                        help="network config when model_path holds weights only")
+    parser.add_argument("--engine", choices=("keras", "numpy"),
+                        default="keras",
+                        help="run the network on Keras or on plain NumPy")
+    args = parser.parse_args()
+
+    ecg = load.load_ecg(args.record)
+    model = server.ModelServer(args.model_path, config_file=args.config_file,
+                               engine=args.engine)
+    predictor = StreamingPredictor(model, chunk_frames=args.chunk_frames)
+    chunks = (ecg[i:i + args.chunk_samples]
+              for i in range(0, len(ecg), args.chunk_samples))
+
+    current, since = None, 0
+    for frame, label in stream_labels(predictor, chunks):
+        if label != current:
+            if current is not None:
+                print("frames {}-{}: {}".format(since, frame - 1, current))
+            current, since = label, frame
+    if current is not None:
+        print("frames {}-{}: {}".format(since, frame, current))
@@ -0,0 +1,229 @@
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import argparse
+import contextlib
+import copy
+import glob
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+import traceback
+
+import store
+
+LEADERBOARD_FILE = "leaderboard.json"
+RESULTS_FILE = "results.jsonl"
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS",
+                   "OPENBLAS_NUM_THREADS", "TF_NUM_INTRAOP_THREADS")
+
+def grid_runs(grid):
+    """
+    Every combination of the values in grid, a dict from param name to
+    the list of values to try.
+    """
+    names = sorted(grid)
+    return [dict(zip(names, values))
+            for values in itertools.product(*[grid[n] for n in names])]
+
+def random_runs(space, num_runs, seed=None):
+    """
+    num_runs distinct draws from space (param name to the list of values
+    to choose from), or every combination if there are fewer than that.
+    """
+    runs = grid_runs(space)
+    rng = random.Random(seed)
+    return rng.sample(runs, min(num_runs, len(runs)))
+
+def make_runs(spec):
+    if "grid" in spec:
+        return grid_runs(spec["grid"])
+    if "random" in spec:
+        return random_runs(spec["random"], spec["num_runs"],
+                           spec.get("seed"))
+    raise ValueError("Sweep spec needs a 'grid' or a 'random' space.")
+
+@contextlib.contextmanager
+def thread_env(threads):
+    """
+    Set the environment variables that cap the threads of the numerical
+    libraries and TensorFlow for as long as the block runs, so processes
+    started in it inherit them. They only take effect for libraries a
+    process has not loaded yet, and importing this module already loads
+    NumPy's BLAS, so they have to be set before the workers start.
+    """
+    env = {var: str(threads) for var in THREAD_ENV_VARS}
+    env["TF_NUM_INTEROP_THREADS"] = "1"
+    saved = {var: os.environ.get(var) for var in env}
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                del os.environ[var]
+            else:
+                os.environ[var] = value
+
+def limit_threads(threads):
+    """
+    Cap the threads of this process's TensorFlow runtime. The library
+    thread pools are capped by thread_env when the worker starts.
+    """
+    import tensorflow as tf
+    if hasattr(tf, "config") and hasattr(tf.config, "threading"):
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    else:
+        from keras import backend as K
+        K.set_session(tf.Session(config=tf.ConfigProto(
+            intra_op_parallelism_threads=threads,
+            inter_op_parallelism_threads=1)))
+
+def summarize(history, monitor="val_loss"):
+    """
+    The epoch with the lowest monitor value and that epoch's metrics.
+    """
+    scores = history.get(monitor)
+    if not scores:
+        return {"epochs": len(history.get("loss", []))}
+    best = min(range(len(scores)), key=lambda e: scores[e])
+    summary = {key: float(values[best]) for key, values in history.items()}
+    summary.update({"epochs": len(scores), "best_epoch": best + 1})
+    return summary
+
+def run(job):
+    """
+    Train one configuration of the sweep in this (worker) process.
+    """
+    index, overrides, params, experiment, max_epochs, threads = job
+    limit_threads(threads)
+    import train
+
+    params = copy.deepcopy(params)
+    params.update(overrides)
+    if max_epochs is not None:
+        params["max_epochs"] = max_epochs
+    args = argparse.Namespace(
+        experiment=os.path.join(experiment, "{:03d}".format(index)),
+        load_workers=0)
+
+    result = {"run": index, "params": overrides}
+    start = time.time()
+    try:
+        save_dir, history = train.train(args, params)
+        # Checkpoint names start with their dev loss.
+        models = glob.glob(os.path.join(save_dir, "*.hdf5"))
+        best_model = min(models, key=lambda m: float(
+            os.path.basename(m).split("-")[0])) if models else None
+        result.update(summarize(history))
+        result.update({"save_dir": save_dir, "best_model": best_model})
+    except Exception:
+        result["error"] = traceback.format_exc()
+    result["seconds"] = time.time() - start
+    return result
+
+def rank(results, monitor="val_loss"):
+    """
+    Results ordered by monitor (lower first), failed runs last.
+    """
+    return sorted(results, key=lambda r: (monitor not in r,
+                                          r.get(monitor, 0)))
+
+def print_leaderboard(results, monitor="val_loss"):
+    names = sorted(set(n for r in results for n in r["params"]))
+    print("{:>4} {:>10} {:>6}  {}".format("run", monitor, "epoch",
+                                          "  ".join(names)))
+    for r in results:
+        score = "{:10.4f}".format(r[monitor]) if monitor in r \
+            else "{:>10}".format("failed")
+        print("{:4d} {} {:>6}  {}".format(
+            r["run"], score, r.get("best_epoch", "-"),
+            "  ".join(json.dumps(r["params"].get(n)) for n in names)))
+
+def sweep(params, spec, experiment, num_workers=None, threads_per_run=1,
+          max_epochs=None, load_workers=0):
+    """
+    Train every run of spec (see make_runs) on top of params, num_workers
+    runs at a time, each in its own process capped to threads_per_run
+    threads. Results are appended to results.jsonl as runs finish and
+    ranked by dev loss in leaderboard.json, both in the sweep directory.
+
+    The datasets are decoded once into their memory-mapped record stores
+    before any run starts, and every run opens those stores, so the
+    workers share one read-only copy of the data through the page cache.
+    """
+    if num_workers is None:
+        num_workers = max(multiprocessing.cpu_count() // threads_per_run, 1)
+    runs = make_runs(spec)
+
+    for data_json in (params["train"], params["dev"]):
+        store.load_dataset(data_json, num_workers=load_workers)
+    params = dict(params, mmap_store=True)
+
+    sweep_dir = os.path.join(params["save_dir"], experiment)
+    if not os.path.exists(sweep_dir):
+        os.makedirs(sweep_dir)
+    with open(os.path.join(sweep_dir, "sweep.json"), 'w') as fid:
+        json.dump({"params": params, "spec": spec}, fid, indent=2)
+
+    print("Running {} runs, {} at a time...".format(len(runs), num_workers))
+    jobs = [(i, overrides, params, experiment, max_epochs, threads_per_run)
+            for i, overrides in enumerate(runs)]
+    results = []
+    # Spawned, single-use workers give every run a fresh TensorFlow. The
+    # pool starts a new worker after every run, so the thread caps stay
+    # in the environment until it is done.
+    with thread_env(threads_per_run):
+        pool = multiprocessing.get_context("spawn").Pool(
+            num_workers, maxtasksperchild=1)
+        try:
+            with open(os.path.join(sweep_dir, RESULTS_FILE), 'a') as fid:
+                for result in pool.imap_unordered(run, jobs):
+                    results.append(result)
+                    fid.write(json.dumps(result) + "\n")
+                    fid.flush()
+                    print("Run {} finished ({} of {}): {}".format(
+                        result["run"], len(results), len(runs),
+                        "failed" if "error" in result else
+                        "val_loss {:.4f}".format(result.get("val_loss", 0))))
+        finally:
+            pool.terminate()
+
+    results = rank(results)
+    with open(os.path.join(sweep_dir, LEADERBOARD_FILE), 'w') as fid:
+        json.dump(results, fid, indent=2)
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Train a grid or random search of configs in parallel.")
+    parser.add_argument("config_file", help="path to base config file")
+    parser.add_argument("sweep_file",
+                        help="json with a 'grid', or a 'random' space and "
+                             "'num_runs'")
+    parser.add_argument("--experiment", "-e", default="sweep",
+                        help="tag with experiment name")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="runs trained at once (default: cores / "
+                             "threads_per_run)")
+    parser.add_argument("--threads_per_run", type=int, default=1,
+                        help="threads each run may use")
+    parser.add_argument("--max_epochs", type=int, default=None,
+                        help="epochs per run, overriding the config's "
+                             "max_epochs")
+    parser.add_argument("--load_workers", type=int, default=0,
+                        help="threads used to build the record stores")
+    args = parser.parse_args()
+    with open(args.config_file, 'r') as fid:
+        params = json.load(fid)
+    with open(args.sweep_file, 'r') as fid:
+        spec = json.load(fid)
+    results = sweep(params, spec, args.experiment, args.workers,
+                    args.threads_per_run, args.max_epochs, args.load_workers)
+    print_leaderboard(results)
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import unittest
+import numpy as np
+
+import batching
+
+'''
+Tests for the asyncio micro-batcher. Run from the sensors/ecg folder:
+python -m unittest discover tests
+'''
+
+class FakeModel(object):
+    """
+    Stands in for a server.ModelServer: every frame's probabilities are
+    the record's mean, and predict_proba can be held until released.
+    """
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.release.set()
+        self.called = threading.Event()
+        self.batches = []
+
+    def predict_proba(self, ecgs):
+        self.called.set()
+        self.release.wait()
+        self.batches.append(len(ecgs))
+        return [np.full((len(e) // 2, 2), np.mean(e)) for e in ecgs]
+
+    def label(self, probs):
+        return "high" if probs[0, 0] > 0 else "low"
+
+class TestMicroBatcher(unittest.TestCase):
+    def test_concurrent_requests_share_a_batch(self):
+        model = FakeModel()
+
+        async def main():
+            async with batching.MicroBatcher(model, max_delay_ms=50) as batcher:
+                return await asyncio.gather(*[batcher.predict(np.full(8, v)) for v in (1, -1, 2)])
+
+        results = asyncio.run(main())
+        self.assertEqual([r.label for r in results], ["high", "low", "high"])
+        self.assertEqual([r.batch_size for r in results], [3, 3, 3])
+        self.assertEqual(model.batches, [3])
+
+    def test_close_cancels_requests_being_predicted(self):
+        model = FakeModel()
+        model.release.clear()
+
+        async def main():
+            batcher = batching.MicroBatcher(model, max_delay_ms=0)
+            running = asyncio.ensure_future(batcher.predict(np.ones(8)))
+            while not model.called.is_set():
+                await asyncio.sleep(0.001)
+            queued = asyncio.ensure_future(batcher.predict(np.ones(8)))
+            await asyncio.sleep(0.01)
+
+            await batcher.close()
+            model.release.set()
+            results = await asyncio.wait_for(asyncio.gather(running, queued, return_exceptions=True), 1)
+            return [type(r) for r in results]
+
+        self.assertEqual(asyncio.run(main()), [asyncio.CancelledError] * 2)
+
+if __name__ == '__main__':
+    unittest.main()
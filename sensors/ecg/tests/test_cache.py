@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+import cache
+import load
+import util
+
+'''
+Tests for the on-disk prediction cache. Run from the sensors/ecg folder:
+python -m unittest discover tests
+'''
+
+class TestPredictionCache(unittest.TestCase):
+    def test_round_trips_arrays(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = cache.PredictionCache(directory)
+            x = np.arange(10, dtype=np.float32)
+            store.put("ab12", x=x, probs=x[:, None])
+            entry = store.get("ab12")
+            np.testing.assert_array_equal(entry["x"], x)
+            np.testing.assert_array_equal(entry["probs"], x[:, None])
+            self.assertIsNone(store.get("cd34"))
+            # A new cache over the same directory sees the entry.
+            self.assertIsNotNone(cache.PredictionCache(directory).get("ab12"))
+
+    def test_evicts_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = cache.PredictionCache(directory)
+            keys = ["aa", "bb", "cc"]
+            for i, key in enumerate(keys):
+                store.put(key, x=np.zeros(100))
+                os.utime(store._path(key), (100 * (i + 1), 100 * (i + 1)))
+            # Reading the oldest entry makes bb the least recently used.
+            store.get("aa")
+            store.max_bytes = store._total
+            store.put("dd", x=np.ones(100))
+
+            self.assertIsNone(store.get("bb"))
+            for key in ("aa", "cc", "dd"):
+                self.assertIsNotNone(store.get(key))
+            self.assertLessEqual(store._total, store.max_bytes)
+
+    def test_file_hash_follows_changes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "record.npy")
+            with open(path, 'wb') as fid:
+                fid.write(b"1234")
+            before = cache.file_hash(path)
+            self.assertEqual(cache.file_hash(path), before)
+
+            # Same size, rewritten within the same second.
+            stat = os.stat(path)
+            with open(path, 'wb') as fid:
+                fid.write(b"5678")
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+            self.assertNotEqual(cache.file_hash(path), before)
+
+class TestPredictCached(unittest.TestCase):
+    def test_empty_dataset(self):
+        try:
+            import predict
+        except ImportError:
+            self.skipTest("Keras is not installed")
+        with tempfile.TemporaryDirectory() as directory:
+            util.save(load.Preproc.from_stats(0.0, 1.0, ["A", "N"]), directory)
+            data_json = os.path.join(directory, "empty.json")
+            open(data_json, 'w').close()
+            probs, counts, _ = predict.predict_cached(
+                data_json, os.path.join(directory, "model.hdf5"),
+                os.path.join(directory, "cache"))
+            self.assertEqual(probs.shape, (0, 0, 2))
+            self.assertEqual(counts.shape, (0,))
+
+if __name__ == '__main__':
+    unittest.main()
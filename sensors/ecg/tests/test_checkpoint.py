@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+import tiny_model
+
+'''
+Tests for asynchronous checkpointing. Run from the sensors/ecg folder:
+python -m unittest discover tests
+'''
+
+@unittest.skipIf(tiny_model.keras is None, "Keras 2 is not installed")
+class TestCheckpointer(unittest.TestCase):
+    def test_keeps_best_and_latest(self):
+        import checkpoint
+        import numpy_engine
+        model = tiny_model.build()
+        model.compile(loss="categorical_crossentropy", optimizer="adam")
+        x = np.random.RandomState(1).randn(2, 64, 1).astype(np.float32)
+
+        with tempfile.TemporaryDirectory() as directory:
+            checkpointer = checkpoint.Checkpointer(
+                os.path.join(directory, "{val_loss:.3f}-{epoch:03d}.hdf5"), keep_best=2)
+            checkpointer.set_model(model)
+            checkpointer.on_train_begin()
+            expected = {}
+            for epoch, val_loss in enumerate([0.5, 0.3, 0.4, 0.6, 0.7]):
+                # Stand in for a training epoch changing the weights.
+                model.set_weights(tiny_model.build(seed=epoch).get_weights())
+                expected[epoch + 1] = model.predict(x)
+                checkpointer.on_epoch_end(epoch, {"val_loss": val_loss})
+            checkpointer.on_train_end()
+
+            self.assertEqual(sorted(os.listdir(directory)),
+                             ["0.300-002.hdf5", "0.400-003.hdf5", "0.700-005.hdf5"])
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                epoch = int(name[-8:-5])
+                loaded = tiny_model.keras.models.load_model(path, compile=False)
+                np.testing.assert_allclose(loaded.predict(x), expected[epoch], atol=1e-6)
+                engine = numpy_engine.NumpyModel(path, tiny_model.PARAMS)
+                np.testing.assert_allclose(engine.predict(x), expected[epoch], atol=1e-4)
+
+if __name__ == '__main__':
+    unittest.main()
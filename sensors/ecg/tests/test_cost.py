@@ -0,0 +1,33 @@
+import unittest
+
+import tiny_model
+
+'''
+Tests for the architecture cost estimator. Run from the sensors/ecg folder:
+python -m unittest discover tests
+'''
+
+@unittest.skipIf(tiny_model.keras is None, "Keras 2 is not installed")
+class TestCost(unittest.TestCase):
+    def test_estimate_matches_model(self):
+        import cost
+        import network
+        for params in (tiny_model.PARAMS, dict(tiny_model.PARAMS, is_regular_conv=True)):
+            report = cost.estimate(params, seconds=10, batch_size=4)
+            model = cost.build(params)
+            jump, start, end = network.receptive_field(model)
+
+            self.assertEqual(report["params"], model.count_params())
+            self.assertEqual(report["output_stride"], jump)
+            self.assertEqual(report["receptive_field_samples"], end - start + 1)
+            self.assertEqual(report["batch_samples"], 4 * 10 * cost.SAMPLE_RATE)
+            self.assertEqual(len(report["layers"]), len(model.layers))
+            self.assertGreater(report["gflops_per_second"], 0)
+
+    def test_token_budget_sets_batch_samples(self):
+        import cost
+        report = cost.estimate(dict(tiny_model.PARAMS, batch_max_tokens=5000))
+        self.assertEqual(report["batch_samples"], 5000)
+
+if __name__ == '__main__':
+    unittest.main()
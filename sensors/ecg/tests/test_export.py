@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+import export
+import tiny_model
+
+'''
+Tests for exporting models for inference. Run from the sensors/ecg folder:
+python -m unittest discover tests
+'''
+
+class TestQuantize(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.weights = [rng.normal(0, 0.3, size=(5, 4, 8)).astype(np.float32),
+                        rng.normal(0, 0.3, size=8).astype(np.float32),
+                        np.zeros((3, 2), dtype=np.float32)]
+
+    def test_round_trips(self):
+        for quantize, rtol in ((None, 0), ("float16", 1e-3), ("int8", 1.0 / 127)):
+            arrays = export.quantize_weights(self.weights, quantize)
+            restored = export.dequantize_weights(arrays)
+            self.assertEqual(len(restored), len(self.weights))
+            for w, r in zip(self.weights, restored):
+                self.assertEqual(r.dtype, np.float32)
+                # int8 error is at most half a step of the channel's scale.
+                bound = rtol * np.abs(w).max(axis=tuple(range(w.ndim - 1)))
+                self.assertTrue(np.all(np.abs(w - r) <= bound / 2 + 1e-7))
+        arrays = export.quantize_weights(self.weights, "int8")
+        self.assertEqual(arrays["w0"].dtype, np.int8)
+        self.assertEqual(arrays["w1"].dtype, np.float32)
+
+    def test_rejects_unknown_quantization(self):
+        with self.assertRaises(ValueError):
+            export.quantize_weights(self.weights, "int4")
+
+@unittest.skipIf(tiny_model.keras is None, "Keras 2 is not installed")
+class TestInferenceModel(unittest.TestCase):
+    def test_matches_original(self):
+        x = np.random.RandomState(1).randn(2, 64, 1).astype(np.float32)
+        for params in (tiny_model.PARAMS, dict(tiny_model.PARAMS, is_regular_conv=True)):
+            model = tiny_model.build(params)
+            exported = export.inference_model(model)
+            names = [type(l).__name__ for l in exported.layers]
+            self.assertNotIn("Dropout", names)
+            self.assertNotIn("Lambda", names)
+            np.testing.assert_allclose(exported.predict(x), model.predict(x), atol=1e-4)
+
+    def test_saved_export_loads(self):
+        model = export.inference_model(tiny_model.build())
+        x = np.random.RandomState(1).randn(2, 64, 1).astype(np.float32)
+        with tempfile.TemporaryDirectory() as directory:
+            export_dir = os.path.join(directory, "export")
+            export.save_exported(model, export_dir, quantize="float16")
+            self.assertTrue(export.is_exported(export_dir))
+            loaded = export.load_exported(export_dir)
+            np.testing.assert_allclose(loaded.predict(x), model.predict(x), atol=1e-2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import json
+import os
+import scipy.io as sio
+import tempfile
+import unittest
+import numpy as np
+
+import load
+
+'''
+Tests for batching and preprocessing in the load module. Run from the sensors/ecg folder:
+python -m unittest discover tests
+'''
+
+def random_records(num_records, max_steps=8, seed=0):
+    rng = np.random.RandomState(seed)
+    return [rng.randn(n * load.STEP) for n in rng.randint(1, max_steps + 1, size=num_records)]
+
+def reference_pad(x, val=0, dtype=np.float32):
+    # The original per-row pad.
+    max_len = max(len(i) for i in x)
+    padded = np.full((len(x), max_len), val, dtype=dtype)
+    for e, i in enumerate(x):
+        padded[e, :len(i)] = i
+    return padded
+
+def random_labels(ecgs, classes=("A", "N", "O", "~"), seed=0):
+    rng = np.random.RandomState(seed)
+    return [list(rng.choice(classes, size=len(e) // load.STEP)) for e in ecgs]
+
+class TestLoad(unittest.TestCase):
+    def test_parallel_load_matches_serial(self):
+        rng = np.random.RandomState(0)
+        with tempfile.TemporaryDirectory() as directory:
+            data_json = os.path.join(directory, "data.json")
+            with open(data_json, 'w') as fid:
+                for i in range(12):
+                    # Lengths that are not whole steps get truncated.
+                    ecg = rng.randint(-2000, 2000, size=rng.randint(1, 5) * load.STEP + i * 7).astype(np.int16)
+                    path = os.path.join(directory, "{}{}".format(i, (".npy", ".mat", ".bin")[i % 3]))
+                    if path.endswith(".npy"):
+                        np.save(path, ecg)
+                    elif path.endswith(".mat"):
+                        sio.savemat(path, {"val": ecg[None]})
+                    else:
+                        ecg.tofile(path)
+                    fid.write(json.dumps({"ecg": path, "labels": ["A"] * (i + 1)}) + "\n")
+
+            ecgs, labels = load.load_dataset(data_json, num_workers=0)
+            self.assertEqual([len(e) % load.STEP for e in ecgs], [0] * 12)
+            self.assertEqual([len(l) for l in labels], list(range(1, 13)))
+            for use_processes in (False, True):
+                parallel_ecgs, parallel_labels = load.load_dataset(data_json, num_workers=2, use_processes=use_processes)
+                self.assertEqual(parallel_labels, labels)
+                self.assertEqual(len(parallel_ecgs), len(ecgs))
+                for parallel, serial in zip(parallel_ecgs, ecgs):
+                    np.testing.assert_array_equal(parallel, serial)
+
+    def test_token_batches_respect_limits(self):
+        ecgs = random_records(100) + [np.zeros(40 * load.STEP)]
+        max_tokens = 6 * load.STEP * 4
+
+        batches = load.make_token_batches(max_tokens, ecgs, max_batch_size=5)
+        self.assertEqual(sorted(i for b in batches for i in b), list(range(len(ecgs))))
+        for batch in batches:
+            padded = len(batch) * max(len(ecgs[i]) for i in batch)
+            self.assertTrue(padded <= max_tokens or len(batch) == 1)
+            self.assertLessEqual(len(batch), 5)
+        # The oversized record is alone in its batch.
+        self.assertIn([len(ecgs) - 1], batches)
+
+        fraction = load.padding_fraction(batches, ecgs)
+        self.assertLess(fraction, load.padding_fraction([list(range(len(ecgs)))], ecgs))
+
+    def test_pad_matches_reference(self):
+        ecgs = random_records(6)
+        np.testing.assert_array_equal(load.pad(ecgs), reference_pad(ecgs))
+
+        out = np.full(10 ** 5, np.nan, dtype=np.float32)
+        padded = load.pad(ecgs, val=3, out=out)
+        np.testing.assert_array_equal(padded, reference_pad(ecgs, val=3))
+        self.assertTrue(np.shares_memory(padded, out))
+
+    def test_process_matches_reference(self):
+        ecgs = random_records(6)
+        labels = random_labels(ecgs)
+        preproc = load.Preproc(ecgs, labels)
+
+        # The original path: hstack statistics, then one-hot targets with
+        # padding frames as class 3 (to_categorical is an identity lookup).
+        stacked = np.hstack(ecgs)
+        mean, std = np.float32(np.mean(stacked)), np.float32(np.std(stacked))
+        codes = reference_pad([[preproc.class_to_int[c] for c in s] for s in labels], val=3, dtype=np.int32)
+        expected_y = np.eye(len(preproc.classes), dtype=np.float32)[codes]
+        expected_x = ((reference_pad(ecgs) - mean) / std)[:, :, None]
+
+        x, y = preproc.process(ecgs, labels)
+        np.testing.assert_allclose(x, expected_x, rtol=1e-5, atol=1e-5)
+        np.testing.assert_array_equal(y, expected_y)
+        np.testing.assert_array_equal(preproc.process_y(preproc.encode_labels(labels)), expected_y)
+
+        sparse = load.Preproc.from_stats(preproc.mean, preproc.std, preproc.classes, sparse=True)
+        np.testing.assert_array_equal(sparse.process_y(labels), codes[:, :, None])
+
+    def test_running_stats_match_numpy(self):
+        ecgs = random_records(20, seed=1)
+        stacked = np.hstack(ecgs)
+
+        stats = load.RunningStats()
+        for e in ecgs:
+            stats.update(e)
+        self.assertEqual(stats.count, stacked.size)
+        self.assertAlmostEqual(stats.mean, np.mean(stacked))
+        self.assertAlmostEqual(stats.std, np.std(stacked))
+
+        # Partial statistics merge to the same result, empty parts included.
+        parts = [load.RunningStats() for _ in range(3)]
+        for i, e in enumerate(ecgs[:15]):
+            parts[i % 2].update(e)
+        merged = load.RunningStats()
+        for part in parts:
+            merged.merge(part)
+        subset = np.hstack(ecgs[:15])
+        self.assertAlmostEqual(merged.mean, np.mean(subset))
+        self.assertAlmostEqual(merged.variance, np.var(subset))
+
+        for num_workers in (0, 3):
+            mean, std = load.compute_mean_std(ecgs, num_workers=num_workers)
+            self.assertAlmostEqual(mean, np.mean(stacked), places=5)
+            self.assertAlmostEqual(std, np.std(stacked), places=5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+import load
+import numpy_engine
+import server
+import tiny_model
+
+'''
+Tests for the NumPy inference engine against Keras. Run from the sensors/ecg folder:
+python -m unittest discover tests
+'''
+
+@unittest.skipIf(tiny_model.keras is None, "Keras 2 is not installed")
+class TestNumpyEngine(unittest.TestCase):
+    def check_matches_keras(self, params):
+        with tempfile.TemporaryDirectory() as directory:
+            model = tiny_model.save(directory, params)
+            engine = numpy_engine.NumpyModel.from_config(
+                os.path.join(directory, "model.hdf5"), os.path.join(directory, "config.json"))
+            x = np.random.RandomState(1).randn(3, 64, 1).astype(np.float32)
+            np.testing.assert_allclose(engine.predict(x), model.predict(x), atol=1e-4)
+
+    def test_resnet_matches_keras(self):
+        self.check_matches_keras(tiny_model.PARAMS)
+
+    def test_regular_conv_matches_keras(self):
+        self.check_matches_keras(dict(tiny_model.PARAMS, is_regular_conv=True))
+
+    def test_server_engines_agree(self):
+        with tempfile.TemporaryDirectory() as directory:
+            tiny_model.save(directory)
+            paths = (os.path.join(directory, "model.hdf5"), os.path.join(directory, "config.json"))
+            ecgs = [np.random.RandomState(i).randint(-500, 500, size=n * load.STEP).astype(np.int16)
+                    for i, n in enumerate([3, 5])]
+            expected = server.ModelServer(paths[0], config_file=paths[1]).predict_proba(ecgs)
+            actual = server.ModelServer(paths[0], config_file=paths[1], engine="numpy").predict_proba(ecgs)
+            for e, a in zip(expected, actual):
+                np.testing.assert_allclose(a, e, atol=1e-4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import profiling
+
+'''
+Tests for the training profiler. Run from the sensors/ecg folder:
+python -m unittest discover tests
+'''
+
+class TestTrainingProfiler(unittest.TestCase):
+    def test_input_stats_pop_in_order(self):
+        stats = profiling.InputStats()
+        stats.record(10, 16, 0.5)
+        stats.record(3, 4, 0.25)
+        self.assertEqual(stats.pop(), (10, 16, 0.5))
+        self.assertEqual(stats.pop(), (3, 4, 0.25))
+        self.assertEqual(stats.pop(), (None, None, None))
+
+    def test_logs_batches_epochs_and_summary(self):
+        profiler = profiling.TrainingProfiler()
+        with profiler.phase("load"):
+            pass
+        with tempfile.TemporaryDirectory() as directory:
+            profiler.log_to(directory)
+            with contextlib.redirect_stdout(io.StringIO()):
+                profiler.on_train_begin()
+                for epoch in range(2):
+                    profiler.on_epoch_begin(epoch)
+                    for batch, (real, padded) in enumerate([(6, 8), (2, 8)]):
+                        profiler.input_stats.record(real, padded, 0.01)
+                        profiler.on_batch_begin(batch)
+                        profiler.on_batch_end(batch, {"size": 2})
+                    profiler.on_epoch_end(epoch)
+                profiler.on_train_end()
+
+            with open(os.path.join(directory, profiling.PROFILE_FILE)) as fid:
+                rows = [json.loads(l) for l in fid]
+            with open(os.path.join(directory, profiling.SUMMARY_FILE)) as fid:
+                summary = json.load(fid)
+
+        self.assertEqual([r["type"] for r in rows],
+                         ["phase"] + ["batch", "batch", "epoch"] * 2)
+        self.assertEqual(rows[0]["name"], "load")
+        self.assertEqual([r["real_samples"] for r in rows if r["type"] == "batch"], [6, 2, 6, 2])
+        self.assertEqual(rows[3]["batches"], 2)
+        self.assertEqual(summary["batches"], 4)
+        self.assertAlmostEqual(summary["padding_fraction"], 0.5)
+        self.assertIn("load", summary["phases"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import json
+import threading
+import unittest
+import numpy as np
+
+try:
+    from urllib.request import Request, urlopen
+except ImportError:
+    from urllib2 import Request, urlopen
+
+import load
+import server
+
+'''
+Tests for the model server and its HTTP endpoint. Run from the sensors/ecg folder:
+python -m unittest discover tests
+'''
+
+class FrameSignModel(object):
+    """
+    Predicts class "N" for frames of 4 samples with a positive mean and
+    "A" otherwise.
+    """
+
+    def predict(self, x):
+        frames = x[:, :, 0].reshape(x.shape[0], -1, 4).mean(axis=2)
+        probs = np.zeros(frames.shape + (2,), dtype=np.float32)
+        probs[:, :, 1] = frames > 0
+        probs[:, :, 0] = frames <= 0
+        return probs
+
+def make_server():
+    model_server = server.ModelServer.__new__(server.ModelServer)
+    model_server.preproc = load.Preproc.from_stats(0.0, 1.0, ["A", "N"])
+    model_server.model = FrameSignModel()
+    model_server._lock = threading.Lock()
+    return model_server
+
+class TestModelServer(unittest.TestCase):
+    def test_classify_ignores_padding_frames(self):
+        model_server = make_server()
+        ecgs = [np.ones(8 * 4), -np.ones(2 * 4), np.r_[np.ones(3 * 4), -np.ones(4)]]
+
+        probs = model_server.predict_proba(ecgs)
+        self.assertEqual([len(p) for p in probs], [8, 2, 4])
+        # Padding zeros would vote "A" for the short positive records if counted.
+        self.assertEqual(model_server.classify(ecgs), ["N", "A", "N"])
+        self.assertEqual(model_server.label(probs[1]), "A")
+
+    def test_http_endpoint(self):
+        httpd = server.make_http_server(make_server(), port=0)
+        thread = threading.Thread(target=httpd.serve_forever)
+        thread.start()
+        try:
+            url = "http://127.0.0.1:{}/".format(httpd.server_port)
+            body = json.dumps({"ecgs": [[1] * 8, [-1] * 4]}).encode('utf-8')
+            reply = json.loads(urlopen(Request(url, body)).read().decode('utf-8'))
+            self.assertEqual(reply, {"labels": ["N", "A"]})
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            thread.join()
+
+if __name__ == '__main__':
+    unittest.main()
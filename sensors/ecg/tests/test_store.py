@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+
+import load
+import store
+
+'''
+Tests for the memory-mapped record store. Run from the sensors/ecg folder:
+python -m unittest discover tests
+'''
+
+def write_dataset(directory, records, labels, name="data.json"):
+    data_json = os.path.join(directory, name)
+    with open(data_json, 'w') as fid:
+        for i, (record, record_labels) in enumerate(zip(records, labels)):
+            path = os.path.join(directory, "{}-{}.npy".format(name, i))
+            np.save(path, np.asarray(record, dtype=np.int16))
+            fid.write(json.dumps({"ecg": path, "labels": record_labels}) + "\n")
+    return data_json
+
+class TestRecordStore(unittest.TestCase):
+    def test_round_trips_records_and_labels(self):
+        rng = np.random.RandomState(0)
+        records = [rng.randint(-2000, 2000, size=n * load.STEP) for n in (3, 1, 5)]
+        labels = [["A"] * 3, ["N"], ["N", "O", "O", "A", "N"]]
+
+        with tempfile.TemporaryDirectory() as directory:
+            data_json = write_dataset(directory, records, labels)
+            ecgs, label_store = store.load_dataset(data_json)
+            expected_ecgs, expected_labels = load.load_dataset(data_json)
+
+            self.assertEqual(len(ecgs), 3)
+            for ecg, expected in zip(ecgs, expected_ecgs):
+                np.testing.assert_array_equal(ecg, expected)
+            self.assertEqual(list(label_store), expected_labels)
+            self.assertEqual(label_store.classes, ["A", "N", "O"])
+            np.testing.assert_array_equal(label_store.codes_at(2), [1, 2, 2, 0, 1])
+
+    def test_rebuilds_when_source_changes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            data_json = write_dataset(directory, [np.ones(load.STEP)], [["A"]])
+            store_dir = store.default_store_dir(data_json)
+            store.load_dataset(data_json)
+            self.assertTrue(store.is_current(data_json, store_dir))
+
+            # Same size and, on coarse clocks, possibly the same second.
+            write_dataset(directory, [np.full(load.STEP, 2)], [["N"]])
+            stat = os.stat(data_json)
+            os.utime(data_json, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+            self.assertFalse(store.is_current(data_json, store_dir))
+
+            ecgs, labels = store.load_dataset(data_json)
+            np.testing.assert_array_equal(ecgs[0], np.full(load.STEP, 2))
+            self.assertEqual(labels[0], ["N"])
+
+    def test_rebuilds_when_a_record_changes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            data_json = write_dataset(directory, [np.ones(load.STEP), np.ones(load.STEP)], [["A"], ["N"]])
+            store_dir = store.default_store_dir(data_json)
+            store.load_dataset(data_json)
+
+            # Re-export one record in place without touching the json.
+            record = os.path.join(directory, "data.json-1.npy")
+            stat = os.stat(record)
+            np.save(record, np.full(load.STEP, 3, dtype=np.int16))
+            os.utime(record, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+            self.assertFalse(store.is_current(data_json, store_dir))
+
+            ecgs, _ = store.load_dataset(data_json)
+            np.testing.assert_array_equal(ecgs[1], np.full(load.STEP, 3))
+            self.assertTrue(store.is_current(data_json, store_dir))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+import load
+import server
+import streaming
+import tiny_model
+
+'''
+Tests for streaming inference. Run from the sensors/ecg folder:
+python -m unittest discover tests
+'''
+
+@unittest.skipIf(tiny_model.keras is None, "Keras 2 is not installed")
+class TestStreaming(unittest.TestCase):
+    def test_numpy_receptive_field_matches_keras(self):
+        import network
+        import numpy_engine
+        for params in (tiny_model.PARAMS, dict(tiny_model.PARAMS, is_regular_conv=True)):
+            model = tiny_model.build(params)
+            engine = numpy_engine.NumpyModel.__new__(numpy_engine.NumpyModel)
+            engine.params = params
+            self.assertEqual(engine.receptive_field(), network.receptive_field(model))
+
+    def test_stream_matches_whole_record_on_numpy_engine(self):
+        with tempfile.TemporaryDirectory() as directory:
+            tiny_model.save(directory)
+            model = server.ModelServer(os.path.join(directory, "model.hdf5"), config_file=os.path.join(directory, "config.json"), engine="numpy")
+
+            rng = np.random.RandomState(0)
+            ecg = rng.randint(-500, 500, size=30 * load.STEP).astype(np.int16)
+            expected = model.predict_proba([ecg])[0]
+
+            predictor = streaming.StreamingPredictor(model, chunk_frames=16)
+            chunks = np.split(ecg, [100, 1000, 1001, 4000, 6000])
+            probs = np.concatenate([predictor.push(c) for c in chunks] + [predictor.flush()])
+            np.testing.assert_allclose(probs, expected, atol=1e-5)
+
+if __name__ == '__main__':
+    unittest.main()
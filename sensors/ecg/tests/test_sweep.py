@@ -0,0 +1,52 @@
+import multiprocessing
+import os
+import unittest
+
+import sweep
+
+'''
+Tests for the hyperparameter sweep helpers. Run from the sensors/ecg folder:
+python -m unittest discover tests
+'''
+
+class TestSweep(unittest.TestCase):
+    def test_grid_runs(self):
+        runs = sweep.grid_runs({"lr": [0.1, 0.01], "depth": [2, 4, 8]})
+        self.assertEqual(len(runs), 6)
+        self.assertEqual(len(set(tuple(sorted(r.items())) for r in runs)), 6)
+        self.assertIn({"lr": 0.01, "depth": 4}, runs)
+
+    def test_random_runs(self):
+        space = {"lr": [0.1, 0.01, 0.001], "depth": [2, 4, 8]}
+        runs = sweep.random_runs(space, 4, seed=3)
+        self.assertEqual(len(runs), 4)
+        self.assertEqual(len(set(tuple(sorted(r.items())) for r in runs)), 4)
+        self.assertEqual(runs, sweep.random_runs(space, 4, seed=3))
+        self.assertEqual(len(sweep.random_runs(space, 20)), 9)
+        with self.assertRaises(ValueError):
+            sweep.make_runs({"num_runs": 2})
+
+    def test_rank_puts_failed_runs_last(self):
+        results = [{"run": 0, "error": "boom"}, {"run": 1, "val_loss": 0.5},
+                   {"run": 2, "val_loss": 0.2}]
+        self.assertEqual([r["run"] for r in sweep.rank(results)], [2, 1, 0])
+
+    def test_summarize_picks_best_epoch(self):
+        history = {"loss": [1.0, 0.8, 0.6], "val_loss": [0.9, 0.7, 0.75]}
+        self.assertEqual(sweep.summarize(history),
+                         {"loss": 0.8, "val_loss": 0.7, "epochs": 3, "best_epoch": 2})
+        self.assertEqual(sweep.summarize({"loss": [1.0]}), {"epochs": 1})
+
+    def test_thread_env_reaches_spawned_workers(self):
+        before = os.environ.get("OMP_NUM_THREADS")
+        with sweep.thread_env(3):
+            pool = multiprocessing.get_context("spawn").Pool(1)
+            try:
+                self.assertEqual(pool.apply(os.getenv, ("OMP_NUM_THREADS",)), "3")
+                self.assertEqual(pool.apply(os.getenv, ("TF_NUM_INTEROP_THREADS",)), "1")
+            finally:
+                pool.terminate()
+        self.assertEqual(os.environ.get("OMP_NUM_THREADS"), before)
+
+if __name__ == '__main__':
+    unittest.main()
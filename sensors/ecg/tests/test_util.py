@@ -0,0 +1,72 @@
+import collections
+import os
+import pickle
+import tempfile
+import unittest
+
+import load
+import util
+
+'''
+Tests for saving and loading preprocessors. Run from the sensors/ecg folder:
+python -m unittest discover tests
+'''
+
+class TestPreprocFiles(unittest.TestCase):
+    def setUp(self):
+        util.clear_cache()
+
+    def test_json_round_trip_and_cache(self):
+        preproc = load.Preproc.from_stats(1.5, 20.25, ["N", "A", "~", "O"], sparse=True)
+        with tempfile.TemporaryDirectory() as directory:
+            util.save(preproc, directory)
+            loaded = util.load(directory)
+            self.assertEqual(loaded.classes, ["A", "N", "O", "~"])
+            self.assertEqual((loaded.mean, loaded.std, loaded.sparse), (preproc.mean, preproc.std, True))
+            self.assertIs(util.load(directory), loaded)
+
+            # A rewrite with the same size is noticed through the nanosecond mtime.
+            path = os.path.join(directory, util.PREPROC_FILE)
+            util.save(load.Preproc.from_stats(2.5, 20.25, preproc.classes, sparse=True), directory)
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+            self.assertEqual(util.load(directory).mean, 2.5)
+
+    def test_loads_legacy_pickle(self):
+        preproc = load.Preproc.from_stats(0.0, 1.0, ["A", "N"])
+        del preproc.sparse # Pickled before sparse targets existed.
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, util.LEGACY_PREPROC_FILE), 'wb') as fid:
+                pickle.dump(preproc, fid)
+            loaded = util.load(directory)
+            self.assertEqual(loaded.classes, ["A", "N"])
+            self.assertFalse(loaded.sparse)
+
+    def test_loads_legacy_pickle_of_any_protocol(self):
+        preproc = load.Preproc.from_stats(0.5, 2.0, ["A", "N"])
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            util.clear_cache()
+            with tempfile.TemporaryDirectory() as directory:
+                with open(os.path.join(directory, util.LEGACY_PREPROC_FILE), 'wb') as fid:
+                    pickle.dump(preproc, fid, protocol)
+                loaded = util.load(directory)
+                self.assertEqual((loaded.mean, loaded.std, loaded.classes), (0.5, 2.0, ["A", "N"]))
+
+    def test_rejects_legacy_pickle_with_other_globals(self):
+        class RunsCode(object):
+            def __reduce__(self):
+                return (os.getcwd, ())
+        for payload in (RunsCode(), collections.OrderedDict(), {"classes": ["A"]}):
+            util.clear_cache()
+            with tempfile.TemporaryDirectory() as directory:
+                with open(os.path.join(directory, util.LEGACY_PREPROC_FILE), 'wb') as fid:
+                    pickle.dump(payload, fid)
+                with self.assertRaises(pickle.UnpicklingError):
+                    util.load(directory)
+
+    def test_rejects_unknown_version(self):
+        with self.assertRaises(ValueError):
+            util.preproc_from_dict({"version": util.PREPROC_VERSION + 1})
+
+if __name__ == '__main__':
+    unittest.main()
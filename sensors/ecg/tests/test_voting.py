@@ -0,0 +1,45 @@
+import unittest
+import numpy as np
+import scipy.stats as sst
+
+import voting
+
+'''
+Tests for record-level voting over frame predictions. Run from the sensors/ecg folder:
+python -m unittest discover tests
+'''
+
+class TestVoting(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.counts = rng.randint(1, 30, size=50)
+        self.probs = rng.dirichlet(np.ones(4), size=(50, 30)).astype(np.float32)
+
+    def test_majority_matches_per_record_mode(self):
+        # The original entry voted each record alone with scipy's mode,
+        # which breaks ties towards the lowest class.
+        expected = [np.ravel(sst.mode(np.argmax(p[:c], axis=1))[0])[0]
+                    for p, c in zip(self.probs, self.counts)]
+        np.testing.assert_array_equal(voting.vote(self.probs, self.counts), expected)
+
+    def test_padding_frames_are_ignored(self):
+        padded = self.probs.copy()
+        mask = voting.frame_mask(self.counts, padded.shape[1])
+        # Padding frames confidently predict class 3.
+        padded[~mask] = [0, 0, 0, 1]
+        for method in voting.VOTING_METHODS:
+            np.testing.assert_array_equal(
+                voting.vote(padded, self.counts, method),
+                [voting.vote(p[None, :c], method=method)[0] for p, c in zip(self.probs, self.counts)])
+
+    def test_scores(self):
+        probs = np.array([[[0.6, 0.4], [0.1, 0.9], [0.2, 0.8], [1.0, 0.0]]])
+        np.testing.assert_array_equal(voting.vote_scores(probs, [3], "majority"), [[1, 2]])
+        np.testing.assert_allclose(voting.vote_scores(probs, [3], "mean"), [[0.3, 0.7]])
+        np.testing.assert_allclose(voting.vote_scores(probs, [3], "confidence"), [[0.6, 1.7]])
+        np.testing.assert_array_equal(voting.frame_counts([1024, 700], 256), [4, 2])
+        with self.assertRaises(ValueError):
+            voting.vote(probs, method="median")
+
+if __name__ == '__main__':
+    unittest.main()
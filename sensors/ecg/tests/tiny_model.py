@@ -0,0 +1,61 @@
+import json
+import os
+import numpy as np
+
+try:
+    import keras
+    # network.py is written against the Keras 2 API.
+    if int(keras.__version__.split(".")[0]) >= 3:
+        keras = None
+except ImportError:
+    keras = None
+
+import load
+import util
+
+'''
+A small trained-looking network saved the way train.py saves one, for tests that need a model.
+'''
+
+CLASSES = ["A", "N", "O", "~"]
+
+PARAMS = {
+    "conv_subsample_lengths": [1, 2, 1, 2],
+    "conv_filter_length": 5,
+    "conv_num_filters_start": 4,
+    "conv_init": "he_normal",
+    "conv_activation": "relu",
+    "conv_dropout": 0.2,
+    "conv_num_skip": 2,
+    "conv_increase_channels_at": 2,
+    "learning_rate": 0.001,
+}
+
+def build(params=PARAMS, seed=0):
+    """
+    The network for params with random weights and batch norm statistics.
+    """
+    import network
+    model = network.build_network(input_shape=[None, 1], num_categories=len(CLASSES), compile=False, **params)
+    rng = np.random.RandomState(seed)
+    weights = []
+    for w in model.get_weights():
+        if w.ndim == 1 and np.all(w == 1):
+            w = rng.uniform(0.5, 1.5, size=w.shape) # gamma or moving variance
+        else:
+            w = rng.normal(0, 0.3, size=w.shape)
+        weights.append(w.astype(np.float32))
+    model.set_weights(weights)
+    return model
+
+def save(directory, params=PARAMS, seed=0):
+    """
+    Write weights (model.hdf5), config.json and the preprocessor to
+    directory and return the Keras model.
+    """
+    model = build(params, seed)
+    model.save_weights(os.path.join(directory, "model.hdf5"))
+    with open(os.path.join(directory, "config.json"), 'w') as fid:
+        json.dump(params, fid)
+    util.save(load.Preproc.from_stats(10.0, 200.0, CLASSES), directory)
+    return model
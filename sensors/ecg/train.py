@@ -10,8 +10,12 @@ import os
 import random
 import time
 
+import checkpoint
 import network
 import load
+import pipeline
+import profiling
+import store
 import util
 
 MAX_EPOCHS = 100
@@ -27,14 +31,56 @@ def get_filename_for_saving(save_dir):
     return os.path.join(save_dir,
             "{val_loss:.3f}-{val_acc:.3f}-{epoch:03d}-{loss:.3f}-{acc:.3f}.hdf5")
 
+def make_batches(batch_size, max_tokens, x):
+    if max_tokens:
+        return load.make_token_batches(max_tokens, x)
+    return load.make_batches(batch_size, x)
+
+class PaddingStats(keras.callbacks.Callback):
+    """
+    Adds the fraction of padded samples in the train and dev batches to
+    the epoch logs.
+    """
+
+    def __init__(self, train_batches, dev_batches, train_x, dev_x):
+        super(PaddingStats, self).__init__()
+        self.train_fraction = load.padding_fraction(train_batches, train_x)
+        self.dev_fraction = load.padding_fraction(dev_batches, dev_x)
+
+    def on_epoch_end(self, epoch, logs=None):
+        if logs is None:
+            return
+        logs["padding_fraction"] = self.train_fraction
+        logs["val_padding_fraction"] = self.dev_fraction
+        print("Epoch {}: padding fraction {:.3f} (dev {:.3f})".format(
+            epoch + 1, self.train_fraction, self.dev_fraction))
+
+def load_dataset(data_json, params, num_workers=0):
+    if params.get("mmap_store", False):
+        return store.load_dataset(data_json, num_workers=num_workers)
+    return load.load_dataset(data_json, num_workers=num_workers)
+
 def train(args, params):
+    """
+    Train a model on params, saving it under params['save_dir']. Returns
+    the run's save directory and the per-epoch training history.
+    """
+
+    profiler = profiling.TrainingProfiler()
 
     print("Loading training set...")
-    train = load.load_dataset(params['train'])
+    with profiler.phase("load_train"):
+        train = load_dataset(params['train'], params, args.load_workers)
     print("Loading dev set...")
-    dev = load.load_dataset(params['dev'])
+    with profiler.phase("load_dev"):
+        dev = load_dataset(params['dev'], params, args.load_workers)
     print("Building preprocessor...")
-    preproc = load.Preproc(*train)
+    with profiler.phase("build_preproc"):
+        preproc = load.Preproc(*train,
+                               sparse=params.get("sparse_targets", False),
+                               num_workers=args.load_workers)
+        train = (train[0], preproc.encode_labels(train[1]))
+        dev = (dev[0], preproc.encode_labels(dev[1]))
     print("Training size: " + str(len(train[0])) + " examples.")
     print("Dev size: " + str(len(dev[0])) + " examples.")
 
@@ -42,6 +88,7 @@ def train(args, params):
     save_dir = make_save_dir(params['save_dir'], args.experiment)
 
     util.save(preproc, save_dir)
+    profiler.log_to(save_dir)
 
     params.update({
         "input_shape": [None, 1],
@@ -57,37 +104,71 @@ def train(args, params):
         patience=2,
         min_lr=params["learning_rate"] * 0.001)
 
-    checkpointer = keras.callbacks.ModelCheckpoint(
-        filepath=get_filename_for_saving(save_dir),
-        save_best_only=False)
+    checkpointer = checkpoint.Checkpointer(
+        get_filename_for_saving(save_dir),
+        keep_best=params.get("checkpoint_keep_best", 3))
 
     batch_size = params.get("batch_size", 32)
-
-    if params.get("generator", False):
-        train_gen = load.data_generator(batch_size, preproc, *train)
-        dev_gen = load.data_generator(batch_size, preproc, *dev)
-        model.fit_generator(
-            train_gen,
-            steps_per_epoch=int(len(train[0]) / batch_size),
-            epochs=MAX_EPOCHS,
-            validation_data=dev_gen,
-            validation_steps=int(len(dev[0]) / batch_size),
-            callbacks=[checkpointer, reduce_lr, stopping])
+    max_epochs = params.get("max_epochs", MAX_EPOCHS)
+    max_tokens = params.get("batch_max_tokens")
+
+    if params.get("generator", False) or max_tokens:
+        train_batches = make_batches(batch_size, max_tokens, train[0])
+        dev_batches = make_batches(batch_size, max_tokens, dev[0])
+        padding = PaddingStats(train_batches, dev_batches, train[0], dev[0])
+
+        pipeline_workers = params.get("pipeline_workers", 0)
+        if pipeline_workers > 0:
+            queue_depth = params.get("pipeline_queue_depth", 4)
+            train_gen = pipeline.BatchPipeline(
+                batch_size, preproc, *train, batches=train_batches,
+                num_workers=pipeline_workers, queue_depth=queue_depth,
+                stats=profiler.input_stats)
+            dev_gen = pipeline.BatchPipeline(
+                batch_size, preproc, *dev, batches=dev_batches,
+                num_workers=pipeline_workers, queue_depth=queue_depth)
+            # Pipeline batches live in recycled buffers, so Keras must
+            # consume them synchronously rather than queue its own.
+            fit_kwargs = {"workers": 0}
+        else:
+            train_gen = load.data_generator(
+                batch_size, preproc, *train, batches=train_batches,
+                stats=profiler.input_stats)
+            dev_gen = load.data_generator(
+                batch_size, preproc, *dev, batches=dev_batches)
+            fit_kwargs = {}
+        try:
+            history = model.fit_generator(
+                train_gen,
+                steps_per_epoch=len(train_batches),
+                epochs=max_epochs,
+                validation_data=dev_gen,
+                validation_steps=len(dev_batches),
+                callbacks=[padding, profiler, checkpointer, reduce_lr,
+                           stopping],
+                **fit_kwargs)
+        finally:
+            train_gen.close()
+            dev_gen.close()
     else:
-        train_x, train_y = preproc.process(*train)
-        dev_x, dev_y = preproc.process(*dev)
-        model.fit(
+        with profiler.phase("preprocess"):
+            train_x, train_y = preproc.process(*train)
+            dev_x, dev_y = preproc.process(*dev)
+        history = model.fit(
             train_x, train_y,
             batch_size=batch_size,
-            epochs=MAX_EPOCHS,
+            epochs=max_epochs,
             validation_data=(dev_x, dev_y),
-            callbacks=[checkpointer, reduce_lr, stopping])
+            callbacks=[profiler, checkpointer, reduce_lr, stopping])
+    return save_dir, history.history
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument("config_file", help="path to config file")
     parser.add_argument("--experiment", "-e", help="tag with experiment name",
                         default="default")
+    parser.add_argument("--load_workers", type=int, default=0,
+                        help="threads used to decode records (0 = serial)")
     args = parser.parse_args()
     params = json.load(open(args.config_file, 'r'))
     train(args, params)
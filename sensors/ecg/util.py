@@ -1,13 +1,107 @@
+import json
 import os
 import pickle
+import threading
 
-def load(dirname):
-    preproc_f = os.path.join(dirname, "preproc.bin")
+from load import Preproc
+
+PREPROC_FILE = "preproc.json"
+PREPROC_VERSION = 1
+
+# Preprocessors from runs before preproc.json existed.
+LEGACY_PREPROC_FILE = "preproc.bin"
+
+# Loaded preprocessors keyed by file path, with the (mtime, size) they were
+# read at.
+_PREPROC_CACHE = {}
+_PREPROC_CACHE_LOCK = threading.Lock()
+
+def preproc_to_dict(preproc):
+    return {"version": PREPROC_VERSION,
+            "mean": float(preproc.mean),
+            "std": float(preproc.std),
+            "classes": list(preproc.classes),
+            "sparse": bool(preproc.sparse)}
+
+def preproc_from_dict(d):
+    version = d.get("version")
+    if version != PREPROC_VERSION:
+        raise ValueError(
+            "Unsupported preprocessor version {}.".format(version))
+    return Preproc.from_stats(d["mean"], d["std"], d["classes"],
+                              sparse=d.get("sparse", False))
+
+# The only globals a pickled preprocessor refers to: the class, numpy's
+# float32 scalars and the helpers older pickle protocols rebuild objects
+# and bytes with. Python 2 and 3 names are both listed, since the legacy
+# files were written by both.
+_LEGACY_PREPROC_GLOBALS = set([
+    ("load", "Preproc"),
+    ("numpy", "dtype"),
+    ("numpy.core.multiarray", "scalar"),
+    ("numpy._core.multiarray", "scalar"),
+    ("copy_reg", "_reconstructor"),
+    ("copyreg", "_reconstructor"),
+    ("__builtin__", "object"),
+    ("builtins", "object"),
+    ("_codecs", "encode"),
+])
+
+class _PreprocUnpickler(pickle.Unpickler):
+    """
+    Unpickler for legacy preproc.bin files that refuses every global but
+    the ones a preprocessor is made of, so loading a file from elsewhere
+    cannot run arbitrary code.
+    """
+
+    def find_class(self, module, name):
+        if (module, name) not in _LEGACY_PREPROC_GLOBALS:
+            raise pickle.UnpicklingError(
+                "{}.{} is not allowed in a preprocessor file.".format(
+                    module, name))
+        return pickle.Unpickler.find_class(self, module, name)
+
+def _read_preproc(preproc_f):
+    if preproc_f.endswith(".json"):
+        with open(preproc_f, 'r') as fid:
+            return preproc_from_dict(json.load(fid))
     with open(preproc_f, 'rb') as fid:
-        preproc = pickle.load(fid)
+        preproc = _PreprocUnpickler(fid).load()
+    if not isinstance(preproc, Preproc):
+        raise pickle.UnpicklingError(
+            "{} does not hold a preprocessor.".format(preproc_f))
+    return preproc
+
+def load(dirname):
+    """
+    Load the preprocessor saved in dirname. Falls back to the pickled
+    preproc.bin of older runs, which may only refer to the globals a
+    preprocessor is made of. Results are cached per process until the
+    file changes, so repeated calls are cheap; treat the returned
+    preprocessor as read-only.
+    """
+    preproc_f = os.path.abspath(os.path.join(dirname, PREPROC_FILE))
+    if not os.path.exists(preproc_f):
+        preproc_f = os.path.abspath(os.path.join(dirname, LEGACY_PREPROC_FILE))
+    stat = os.stat(preproc_f)
+    # st_mtime_ns is missing on Python 2, which the cinc17 entry runs.
+    signature = (getattr(stat, "st_mtime_ns", stat.st_mtime), stat.st_size)
+
+    with _PREPROC_CACHE_LOCK:
+        cached = _PREPROC_CACHE.get(preproc_f)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    preproc = _read_preproc(preproc_f)
+    with _PREPROC_CACHE_LOCK:
+        _PREPROC_CACHE[preproc_f] = (signature, preproc)
     return preproc
 
 def save(preproc, dirname):
-    preproc_f = os.path.join(dirname, "preproc.bin")
-    with open(preproc_f, 'wb') as fid:
-        pickle.dump(preproc, fid)
+    preproc_f = os.path.join(dirname, PREPROC_FILE)
+    with open(preproc_f, 'w') as fid:
+        json.dump(preproc_to_dict(preproc), fid, indent=2)
+
+def clear_cache():
+    with _PREPROC_CACHE_LOCK:
+        _PREPROC_CACHE.clear()
@@ -0,0 +1,54 @@
+from __future__ import division
+from __future__ import absolute_import
+
+import numpy as np
+
+VOTING_METHODS = ("majority", "mean", "confidence")
+
+def frame_counts(lengths, step):
+    """
+    Number of output frames for records of the given sample lengths, for
+    a model that emits one frame every step samples.
+    """
+    return np.asarray(lengths) // step
+
+def frame_mask(counts, num_frames):
+    """
+    Boolean (records, num_frames) mask of the frames that belong to each
+    record rather than to batch padding.
+    """
+    return np.arange(num_frames) < np.asarray(counts)[:, None]
+
+def vote_scores(probs, counts=None, method="majority"):
+    """
+    Record-level class scores from (records, frames, classes) frame
+    probabilities, ignoring frames past each record's count.
+
+    majority: the number of frames predicting each class.
+    mean: the mean probability of each class over the frames.
+    confidence: like majority, but each frame's vote is weighted by its
+        probability for the class it predicts.
+    """
+    probs = np.asarray(probs)
+    if counts is None:
+        counts = np.full(probs.shape[0], probs.shape[1])
+    mask = frame_mask(counts, probs.shape[1])[:, :, None]
+
+    if method == "mean":
+        totals = np.where(mask, probs, 0).sum(axis=1)
+        return totals / np.maximum(np.asarray(counts), 1)[:, None]
+    if method not in ("majority", "confidence"):
+        raise ValueError("Unknown voting method: {}".format(method))
+
+    predicted = np.argmax(probs, axis=2)[:, :, None]
+    votes = np.arange(probs.shape[2]) == predicted
+    if method == "confidence":
+        weights = probs.max(axis=2, keepdims=True)
+        return np.where(mask & votes, weights, 0).sum(axis=1)
+    return (mask & votes).sum(axis=1)
+
+def vote(probs, counts=None, method="majority"):
+    """
+    Record-level class indices; ties go to the lowest class index.
+    """
+    return np.argmax(vote_scores(probs, counts, method), axis=1)
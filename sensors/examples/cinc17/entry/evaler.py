@@ -1,32 +1,27 @@
-import json
-import keras
-import numpy as np
-import scipy.io as sio
-import scipy.stats as sst
+from __future__ import print_function
 
 import load
-import network
-import util
+import server
 
-def predict(record):
-    ecg = load.load_ecg(record +".mat")
-    preproc = util.load(".")
-    x = preproc.process_x([ecg])
-
-    params = json.load(open("config.json"))
-    params.update({
-        "compile" : False,
-        "input_shape": [None, 1],
-        "num_categories": len(preproc.classes)
-    })
+_SERVER = None
 
-    model = network.build_network(**params)
-    model.load_weights('model.hdf5')
+def get_server():
+    """
+    The model server for this entry, loaded on first use and then kept
+    for every later record.
+    """
+    global _SERVER
+    if _SERVER is None:
+        _SERVER = server.ModelServer("model.hdf5", preproc_dir=".",
+                                     config_file="config.json",
+                                     engine="numpy")
+    return _SERVER
 
-    probs = model.predict(x)
-    prediction = sst.mode(np.argmax(probs, axis=2).squeeze())[0][0]
-    return preproc.int_to_class[prediction]
+def predict(record):
+    ecg = load.load_ecg(record +".mat")
+    return get_server().classify([ecg])[0]
 
 if __name__ == '__main__':
     import sys
-    print predict(sys.argv[1])
+    for record in sys.argv[1:]:
+        print(predict(record))
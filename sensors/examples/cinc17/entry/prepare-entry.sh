@@ -21,13 +21,17 @@ cp ../evaler.py .
 pip download -r ../requirements.txt -d packages
 
 src_dir='../../../../ecg'
-for f in 'util.py' 'load.py' 'network.py'; do
+for f in 'util.py' 'load.py' 'network.py' 'server.py' 'voting.py' 'numpy_engine.py'; do
     cp $src_dir/$f .
 done
 
 ## Copy model files
 python ../weights_only.py $1
-cp `dirname $1`/preproc.bin preproc.bin 
+if [ -f `dirname $1`/preproc.json ]; then
+    cp `dirname $1`/preproc.json preproc.json
+else
+    cp `dirname $1`/preproc.bin preproc.bin
+fi
 
 echo "==== running entry script on validation set ===="
 validation=../../data/sample2017/validation
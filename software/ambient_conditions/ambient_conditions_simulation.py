@@ -1,10 +1,9 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import simulation
-import harvested_energy_estimation
 
 '''
-This script simulates the performance of the ThermoBeat system under varying ambient temperatures and temperature gradients, using the teg_output and ltc3108_output functions from the simulation module, as well as the energy_harvested function from the harvested energy estimation module.
+This script simulates the performance of the ThermoBeat system under varying ambient temperatures and temperature gradients, using the output power of a HarvesterModel from the simulation module (DEFAULT_MODEL unless another model is given).
 
 The script generates a heatmap, showing the harvested energy as a function of ambient temperature and temperature gradient. This visualization can help identify the optimal operating conditions for the ThermoBeat system.
 
@@ -15,22 +14,11 @@ A window with the heatmap should appear, showing the relationship between harves
 '''
 
 
-def simulate_ambient_conditions(ambient_temperatures, temperature_gradient_range, duration):
-    energies = []
+def simulate_ambient_conditions(ambient_temperatures, temperature_gradient_range, duration, model=simulation.DEFAULT_MODEL):
+    energies = model.output_power_array(temperature_gradient_range) * duration
 
-    for ambient_temperature in ambient_temperatures:
-        temp_energies = []
-
-        for temperature_gradient in temperature_gradient_range:
-            output_voltage, output_current = simulation.teg_output(temperature_gradient, 50.4, 3.11)
-            output_voltage, output_current = simulation.ltc3108_output(output_voltage, output_current)
-
-            energy = harvested_energy_estimation.energy_harvested(temperature_gradient, duration, output_voltage, output_current)
-            temp_energies.append(energy)
-
-        energies.append(temp_energies)
-
-    return np.array(energies)
+    # The harvest chain does not depend on the ambient temperature, so every row is the same.
+    return np.tile(energies, (len(ambient_temperatures), 1))
 
 def plot_ambient_conditions_simulation(ambient_temperatures, temperature_gradient_range, energies):
     fig, ax = plt.subplots()
@@ -13,24 +13,91 @@ python battery_charge_discharge.py
 A window with the plot should appear, showing the remaining battery energy over time, illustrating the charging and discharging cycles of the battery. This information can be useful for evaluating the system's performance and identifying potential improvements to the energy harvesting and power management strategies.
 '''
 
-def simulate_battery_charge_discharge(temperature_gradient, battery_capacity_mAh, battery_voltage, device_power_consumption_mW, simulation_time_hours, time_step_hours):
-    battery_energy_capacity_mWh = battery_capacity_mAh * battery_voltage
-    battery_energy_remaining_mWh = battery_energy_capacity_mWh
+def simulate_battery_events(segment_start_hours, harvest_power_mW, device_power_consumption_mW, battery_energy_capacity_mWh, initial_energy_mWh, end_hours):
+    # Between input changes the battery energy is linear in time, so each segment is solved analytically:
+    # it either charges/discharges at a constant net rate or hits an event (full or empty) and then stays
+    # saturated until the next segment starts. Returns the breakpoints of the piecewise-linear trajectory.
+    segment_start_hours = np.atleast_1d(np.asarray(segment_start_hours, dtype=np.float64))
+    net_power_mW = np.broadcast_to(np.subtract(harvest_power_mW, device_power_consumption_mW, dtype=np.float64), segment_start_hours.shape)
+    segment_end_hours = np.append(np.minimum(segment_start_hours[1:], end_hours), end_hours)
 
-    time_points = np.arange(0, simulation_time_hours, time_step_hours)
-    battery_energy_remaining_history = []
+    battery_energy_mWh = min(max(initial_energy_mWh, 0.0), battery_energy_capacity_mWh)
+    event_times = [segment_start_hours[0]]
+    event_energies = [battery_energy_mWh]
+
+    for start, end, net_power in zip(segment_start_hours, segment_end_hours, net_power_mW):
+        duration = end - start
+        if duration <= 0:
+            continue
+
+        if net_power > 0:
+            target_energy_mWh = battery_energy_capacity_mWh
+            time_to_event = (battery_energy_capacity_mWh - battery_energy_mWh) / net_power
+        elif net_power < 0:
+            target_energy_mWh = 0.0
+            time_to_event = battery_energy_mWh / -net_power
+        else:
+            time_to_event = float("inf")
+
+        if time_to_event < duration:
+            if time_to_event > 0:
+                event_times.append(start + time_to_event)
+                event_energies.append(target_energy_mWh)
+            battery_energy_mWh = target_energy_mWh
+        else:
+            battery_energy_mWh += net_power * duration
+
+        event_times.append(end)
+        event_energies.append(battery_energy_mWh)
+
+    return np.array(event_times), np.array(event_energies)
 
-    for t in time_points:
-        output_voltage, output_current = simulation.teg_output(temperature_gradient, 50.4, 3.11)
-        output_voltage, output_current = simulation.ltc3108_output(output_voltage, output_current)
+def sample_battery_history(event_times, event_energies, time_points):
+    # The trajectory is exactly linear between events, so interpolation reproduces it at any resolution.
+    return np.interp(time_points, event_times, event_energies)
 
-        energy_harvested_mWh = output_voltage * output_current * time_step_hours
-        energy_consumed_mWh = device_power_consumption_mW * time_step_hours
+def update_battery_levels(initial_energy_mWh, net_energy_mWh, battery_energy_capacity_mWh):
+    # Applies a sequence of net energy increments with the battery clamped to [0, capacity] after each one,
+    # which is exact when the net power is constant within each increment. Instead of a per-step loop the
+    # running sum is reflected at one bound with a cumulative max/min until it crosses the other bound, so
+    # the number of vectorized passes equals the number of full <-> empty transitions.
+    net_energy_mWh = np.asarray(net_energy_mWh, dtype=np.float64)
+    battery_levels = np.empty_like(net_energy_mWh)
+    battery_energy_mWh = min(max(initial_energy_mWh, 0.0), battery_energy_capacity_mWh)
+    reflect_at_capacity = True
+    start = 0
 
-        battery_energy_remaining_mWh += energy_harvested_mWh - energy_consumed_mWh
-        battery_energy_remaining_mWh = min(battery_energy_remaining_mWh, battery_energy_capacity_mWh)
+    while start < len(net_energy_mWh):
+        unclamped = battery_energy_mWh + np.cumsum(net_energy_mWh[start:])
+        if reflect_at_capacity:
+            levels = unclamped - np.maximum.accumulate(np.maximum(unclamped - battery_energy_capacity_mWh, 0))
+            crossed = np.flatnonzero(levels < 0)
+        else:
+            levels = unclamped + np.maximum.accumulate(np.maximum(-unclamped, 0))
+            crossed = np.flatnonzero(levels > battery_energy_capacity_mWh)
+
+        if not crossed.size:
+            battery_levels[start:] = levels
+            break
+
+        end = start + crossed[0]
+        battery_levels[start:end] = levels[:crossed[0]]
+        battery_energy_mWh = 0.0 if reflect_at_capacity else battery_energy_capacity_mWh
+        battery_levels[end] = battery_energy_mWh
+        reflect_at_capacity = not reflect_at_capacity
+        start = end + 1
+
+    return battery_levels
+
+def simulate_battery_charge_discharge(temperature_gradient, battery_capacity_mAh, battery_voltage, device_power_consumption_mW, simulation_time_hours, time_step_hours, model=simulation.DEFAULT_MODEL):
+    battery_energy_capacity_mWh = battery_capacity_mAh * battery_voltage
+    harvest_power_mW = model.output_power(temperature_gradient)
+
+    time_points = np.arange(0, simulation_time_hours, time_step_hours)
+    event_times, event_energies = simulate_battery_events(0, harvest_power_mW, device_power_consumption_mW, battery_energy_capacity_mWh, battery_energy_capacity_mWh, simulation_time_hours + time_step_hours)
 
-        battery_energy_remaining_history.append(battery_energy_remaining_mWh)
+    # Each history entry is the energy remaining at the end of its time step.
+    battery_energy_remaining_history = sample_battery_history(event_times, event_energies, time_points + time_step_hours)
 
     return time_points, battery_energy_remaining_history
 
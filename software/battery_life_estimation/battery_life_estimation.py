@@ -1,10 +1,9 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import simulation
-import harvested_energy_estimation
 
 '''
-This script calculates the expected battery life for different temperature gradients and battery capacities. It uses the teg_output and ltc3108_output functions from the simulation module, as well as the energy_harvested function from the harvested_energy_estimation module.
+This script calculates the expected battery life for different temperature gradients and battery capacities. It uses the output power of a HarvesterModel from the simulation module (DEFAULT_MODEL unless another model is given).
 
 The script generates a heatmap plot showing the relationship between the expected battery life, temperature gradients, and battery capacities.
 
@@ -14,27 +13,20 @@ python battery_life_estimation.py
 A window with the heatmap plot should appear, showing the estimated battery life for different temperature gradients and battery capacities. This information can be useful for determining the appropriate battery capacity and temperature gradient requirements to ensure sufficient battery life for the ThermoBeat system under various conditions.
 '''
 
-def battery_life_hours(temperature_gradient, battery_capacity_mAh, battery_voltage, device_power_consumption_mW):
-    output_voltage, output_current = simulation.teg_output(temperature_gradient, 50.4, 3.11)
-    output_voltage, output_current = simulation.ltc3108_output(output_voltage, output_current)
-
-    energy_harvested_per_hour_mWh = harvested_energy_estimation.energy_harvested(temperature_gradient, 1, output_voltage, output_current)
-    battery_energy_capacity_mWh = battery_capacity_mAh * battery_voltage
+def battery_life_hours(temperature_gradient, battery_capacity_mAh, battery_voltage, device_power_consumption_mW, model=simulation.DEFAULT_MODEL):
+    energy_harvested_per_hour_mWh = model.output_power_array(temperature_gradient)
+    battery_energy_capacity_mWh = np.multiply(battery_capacity_mAh, battery_voltage)
 
     net_energy_consumption_mWh = device_power_consumption_mW - energy_harvested_per_hour_mWh
-    if net_energy_consumption_mWh > 0:
-        battery_life_hours = battery_energy_capacity_mWh / net_energy_consumption_mWh
-    else:
-        battery_life_hours = float("inf")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        battery_life_hours = np.where(net_energy_consumption_mWh > 0, battery_energy_capacity_mWh / np.maximum(net_energy_consumption_mWh, 0), float("inf"))
 
-    return battery_life_hours
+    return battery_life_hours.item() if battery_life_hours.ndim == 0 else battery_life_hours
 
 def plot_battery_life(temperature_gradients, battery_capacities_mAh, battery_voltage, device_power_consumption_mW):
-    battery_life_matrix = np.zeros((len(temperature_gradients), len(battery_capacities_mAh)))
-
-    for i, temperature_gradient in enumerate(temperature_gradients):
-        for j, battery_capacity_mAh in enumerate(battery_capacities_mAh):
-            battery_life_matrix[i, j] = battery_life_hours(temperature_gradient, battery_capacity_mAh, battery_voltage, device_power_consumption_mW)
+    temperature_gradients = np.asarray(temperature_gradients)
+    battery_capacities_mAh = np.asarray(battery_capacities_mAh)
+    battery_life_matrix = battery_life_hours(temperature_gradients[:, None], battery_capacities_mAh[None, :], battery_voltage, device_power_consumption_mW)
 
     plt.imshow(battery_life_matrix, cmap="viridis", origin="lower", extent=[min(battery_capacities_mAh), max(battery_capacities_mAh), min(temperature_gradients), max(temperature_gradients)], aspect="auto")
     plt.colorbar(label="Battery Life (hours)")
@@ -1,5 +1,6 @@
 import argparse
 import simulation
+import converter_model
 import harvested_energy_estimation
 
 '''
@@ -11,6 +12,9 @@ python thermobeat_cli.py 3 2 --estimate_energy
 
 3. Perform both simulation and energy estimation for a 3°C temperature gradient and a 2-hour duration:
 python thermobeat_cli.py 3 2 --simulate --estimate_energy
+
+4. Use a measured LTC3108 efficiency curve instead of the assumed 80% efficiency:
+python thermobeat_cli.py 3 2 --simulate --efficiency_table ltc3108_efficiency.csv
 '''
 
 def main():
@@ -19,19 +23,22 @@ def main():
     parser.add_argument("duration", type=float, help="Duration of energy harvesting (in hours).")
     parser.add_argument("--simulate", action="store_true", help="Simulate the ThermoBeat system for the given temperature gradient and duration.")
     parser.add_argument("--estimate_energy", action="store_true", help="Estimate the harvested energy for the given temperature gradient and duration.")
+    parser.add_argument("--efficiency_table", help="CSV file with the LTC3108 efficiency curve (see converter_model.parse_efficiency_table).")
 
     args = parser.parse_args()
 
+    model = simulation.DEFAULT_MODEL
+    if args.efficiency_table:
+        model = model.replace(efficiency=converter_model.load_efficiency_table(args.efficiency_table))
+
     if args.simulate:
-        output_voltage, output_current = simulation.teg_output(args.temperature_gradient, 50.4, 3.11)
-        output_voltage, output_current = simulation.ltc3108_output(output_voltage, output_current)
+        output_voltage, output_current = model.output(args.temperature_gradient)
 
         print(f"Output Voltage: {output_voltage} mV")
         print(f"Output Current: {output_current} mA")
 
     if args.estimate_energy:
-        output_voltage, output_current = simulation.teg_output(args.temperature_gradient, 50.4, 3.11)
-        output_voltage, output_current = simulation.ltc3108_output(output_voltage, output_current)
+        output_voltage, output_current = model.output(args.temperature_gradient)
 
         energy = harvested_energy_estimation.energy_harvested(args.temperature_gradient, args.duration, output_voltage, output_current)
         print(f"Harvested Energy: {energy} mWh")
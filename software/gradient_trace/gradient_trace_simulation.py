@@ -0,0 +1,185 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+import simulation
+import battery_charge_discharge
+
+'''
+This script drives the ThermoBeat simulation with recorded temperature gradient time series instead of a single constant gradient. Gradient logs are read from CSV, Parquet or NumPy (.npy, memory-mapped) files in fixed-size chunks, and every chunk is pushed through the TEG -> LTC3108 chain (a HarvesterModel from the simulation module) and the battery update logic from the battery_charge_discharge module. The battery state is carried from one chunk to the next, so memory use is bounded by the chunk size rather than the length of the trace.
+
+Each sample's gradient is held until the next sample's timestamp. Traces either contain a gradient column directly or skin and ambient temperature columns, in which case the gradient is their difference.
+
+To summarize a trace, execute the following command from the software/gradient_trace folder:
+python gradient_trace_simulation.py wearer_log.csv --battery_capacity_mAh 1200 --device_power_consumption_mW 336
+'''
+
+def _gradients_from_columns(columns, time_column, gradient_column, skin_column, ambient_column):
+    times = np.asarray(columns[time_column], dtype=np.float64)
+    if skin_column is not None and ambient_column is not None:
+        gradients = np.asarray(columns[skin_column], dtype=np.float64) - np.asarray(columns[ambient_column], dtype=np.float64)
+    else:
+        gradients = np.asarray(columns[gradient_column], dtype=np.float64)
+    return times, gradients
+
+def read_gradient_chunks(file_path, chunk_size=100000, time_column="time_hours", gradient_column="temperature_gradient", skin_column=None, ambient_column=None):
+    """
+    Read a temperature gradient time series in chunks.
+
+    Args:
+    file_path (str): Path to a .csv, .parquet or .npy file. A .npy file holds either a structured array with named fields or a 2-D array whose columns are time and gradient, or time, skin and ambient temperature. A 2-D array has no column names, so the column arguments must be left at their defaults for it.
+    chunk_size (int): The number of samples per chunk.
+    time_column (str): The column holding the sample timestamps (in hours).
+    gradient_column (str): The column holding the temperature gradient (in °C).
+    skin_column (str): Optional skin temperature column; together with ambient_column it replaces gradient_column.
+    ambient_column (str): Optional ambient temperature column.
+
+    Yields:
+    tuple: Arrays of timestamps (in hours) and temperature gradients (in °C) for each chunk.
+    """
+    if skin_column is not None and ambient_column is not None:
+        columns = [time_column, skin_column, ambient_column]
+    else:
+        columns = [time_column, gradient_column]
+    extension = os.path.splitext(file_path)[1].lower()
+
+    if extension == ".csv":
+        for chunk in pd.read_csv(file_path, usecols=columns, chunksize=chunk_size):
+            yield _gradients_from_columns(chunk, time_column, gradient_column, skin_column, ambient_column)
+    elif extension == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet gradient traces requires pyarrow to be installed.")
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield _gradients_from_columns(batch.to_pydict(), time_column, gradient_column, skin_column, ambient_column)
+    elif extension == ".npy":
+        trace = np.load(file_path, mmap_mode="r")
+        if trace.dtype.names is None:
+            if (time_column, gradient_column, skin_column, ambient_column) != ("time_hours", "temperature_gradient", None, None):
+                raise ValueError("Column names cannot be chosen for an unstructured .npy gradient trace.")
+            if trace.ndim != 2 or trace.shape[1] not in (2, 3):
+                raise ValueError(f"An unstructured .npy gradient trace must have 2 or 3 columns, got shape {trace.shape}.")
+        for start in range(0, len(trace), chunk_size):
+            chunk = trace[start:start + chunk_size]
+            if chunk.dtype.names is not None:
+                yield _gradients_from_columns(chunk, time_column, gradient_column, skin_column, ambient_column)
+            elif chunk.shape[1] == 3:
+                yield np.asarray(chunk[:, 0], dtype=np.float64), np.asarray(chunk[:, 1], dtype=np.float64) - np.asarray(chunk[:, 2], dtype=np.float64)
+            else:
+                yield np.asarray(chunk[:, 0], dtype=np.float64), np.asarray(chunk[:, 1], dtype=np.float64)
+    else:
+        raise ValueError(f"Unsupported gradient trace format: {extension}")
+
+def simulate_gradient_trace(chunks, battery_capacity_mAh, battery_voltage, device_power_consumption_mW, initial_energy_mWh=None, model=simulation.DEFAULT_MODEL):
+    """
+    Stream gradient chunks through the TEG, LTC3108 and battery models, carrying the battery state between chunks.
+
+    Args:
+    chunks (iterable): An iterable of (timestamps, gradients) array pairs, e.g. from read_gradient_chunks.
+    battery_capacity_mAh (float): The battery capacity (in mAh).
+    battery_voltage (float): The battery voltage (in V).
+    device_power_consumption_mW (float): The device power consumption (in mW).
+    initial_energy_mWh (float): The battery energy at the first timestamp (in mWh). Defaults to a full battery.
+    model (simulation.HarvesterModel): The harvester model used to convert gradients to output power.
+
+    Yields:
+    tuple: Arrays of timestamps (in hours), harvested power (in mW) and remaining battery energy (in mWh) at each timestamp of the chunk.
+    """
+    battery_energy_capacity_mWh = battery_capacity_mAh * battery_voltage
+    battery_energy_mWh = battery_energy_capacity_mWh if initial_energy_mWh is None else initial_energy_mWh
+    previous_time = None
+    previous_power_mW = None
+
+    for times, gradients in chunks:
+        if len(times) == 0:
+            continue
+        harvest_power_mW = model.output_power_array(gradients)
+
+        if previous_time is None:
+            # A zero-length segment before the first sample makes its level the initial battery energy.
+            previous_time = times[0]
+            previous_power_mW = harvest_power_mW[0]
+
+        segment_times = np.concatenate(([previous_time], times))
+        segment_power_mW = np.concatenate(([previous_power_mW], harvest_power_mW[:-1]))
+        net_energy_mWh = (segment_power_mW - device_power_consumption_mW) * np.diff(segment_times)
+        battery_levels = battery_charge_discharge.update_battery_levels(battery_energy_mWh, net_energy_mWh, battery_energy_capacity_mWh)
+
+        battery_energy_mWh = battery_levels[-1]
+        previous_time = times[-1]
+        previous_power_mW = harvest_power_mW[-1]
+
+        yield times, harvest_power_mW, battery_levels
+
+def summarize_gradient_trace(file_path, battery_capacity_mAh, battery_voltage, device_power_consumption_mW, chunk_size=100000, model=simulation.DEFAULT_MODEL, **column_kwargs):
+    """
+    Summarize a gradient trace without holding it in memory.
+
+    Args:
+    file_path (str): Path to the gradient trace (see read_gradient_chunks).
+    battery_capacity_mAh (float): The battery capacity (in mAh).
+    battery_voltage (float): The battery voltage (in V).
+    device_power_consumption_mW (float): The device power consumption (in mW).
+    chunk_size (int): The number of samples per chunk.
+    model (simulation.HarvesterModel): The harvester model used to convert gradients to output power.
+    **column_kwargs: Column names forwarded to read_gradient_chunks.
+
+    Returns:
+    dict: Trace duration (hours), harvested energy (mWh), final and minimum battery energy (mWh), and the number of samples at which the battery was empty.
+    """
+    chunks = read_gradient_chunks(file_path, chunk_size=chunk_size, **column_kwargs)
+
+    start_time = None
+    end_time = None
+    previous_time = None
+    previous_power_mW = 0.0
+    harvested_energy_mWh = 0.0
+    minimum_energy_mWh = float("inf")
+    empty_samples = 0
+    battery_energy_mWh = None
+
+    for times, harvest_power_mW, battery_levels in simulate_gradient_trace(chunks, battery_capacity_mAh, battery_voltage, device_power_consumption_mW, model=model):
+        if start_time is None:
+            start_time = times[0]
+            previous_time = times[0]
+        durations = np.diff(np.concatenate(([previous_time], times)))
+        powers = np.concatenate(([previous_power_mW], harvest_power_mW[:-1]))
+        harvested_energy_mWh += float(np.dot(powers, durations))
+
+        minimum_energy_mWh = min(minimum_energy_mWh, float(battery_levels.min()))
+        empty_samples += int(np.count_nonzero(battery_levels <= 0))
+        battery_energy_mWh = float(battery_levels[-1])
+        previous_time = times[-1]
+        previous_power_mW = harvest_power_mW[-1]
+        end_time = times[-1]
+
+    return {
+        'duration_hours': 0.0 if start_time is None else float(end_time - start_time),
+        'harvested_energy_mWh': harvested_energy_mWh,
+        'final_energy_mWh': battery_energy_mWh,
+        'minimum_energy_mWh': minimum_energy_mWh,
+        'empty_samples': empty_samples,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the ThermoBeat system over a recorded temperature gradient trace.")
+    parser.add_argument("trace", help="Path to the gradient trace (.csv, .parquet or .npy).")
+    parser.add_argument("--battery_capacity_mAh", type=float, default=1200, help="Battery capacity (in mAh).")
+    parser.add_argument("--battery_voltage", type=float, default=3.7, help="Battery voltage (in V).")
+    parser.add_argument("--device_power_consumption_mW", type=float, default=336, help="Device power consumption (in mW).")
+    parser.add_argument("--chunk_size", type=int, default=100000, help="Number of samples processed per chunk.")
+    parser.add_argument("--time_column", default="time_hours", help="Timestamp column (in hours).")
+    parser.add_argument("--gradient_column", default="temperature_gradient", help="Temperature gradient column (in °C).")
+    parser.add_argument("--skin_column", help="Skin temperature column; used with --ambient_column instead of the gradient column.")
+    parser.add_argument("--ambient_column", help="Ambient temperature column.")
+
+    args = parser.parse_args()
+
+    summary = summarize_gradient_trace(args.trace, args.battery_capacity_mAh, args.battery_voltage, args.device_power_consumption_mW, chunk_size=args.chunk_size, time_column=args.time_column, gradient_column=args.gradient_column, skin_column=args.skin_column, ambient_column=args.ambient_column)
+
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -39,8 +39,7 @@ class ThermoBeatGUI(tk.Tk):
         temperature_gradient = float(self.entry_temperature_gradient.get())
         duration = float(self.entry_duration.get())
 
-        output_voltage, output_current = simulation.teg_output(temperature_gradient, 50.4, 3.11)
-        output_voltage, output_current = simulation.ltc3108_output(output_voltage, output_current)
+        output_voltage, output_current = simulation.DEFAULT_MODEL.output(temperature_gradient)
 
         print(f"Output Voltage: {output_voltage} mV")
         print(f"Output Current: {output_current} mA")
@@ -49,8 +48,7 @@ class ThermoBeatGUI(tk.Tk):
         temperature_gradient = float(self.entry_temperature_gradient.get())
         duration = float(self.entry_duration.get())
 
-        output_voltage, output_current = simulation.teg_output(temperature_gradient, 50.4, 3.11)
-        output_voltage, output_current = simulation.ltc3108_output(output_voltage, output_current)
+        output_voltage, output_current = simulation.DEFAULT_MODEL.output(temperature_gradient)
 
         energy = harvested_energy_estimation.energy_harvested(temperature_gradient, duration, output_voltage, output_current)
         print(f"Harvested Energy: {energy} mWh")
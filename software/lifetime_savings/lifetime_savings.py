@@ -1,10 +1,9 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import simulation
-import harvested_energy_estimation
 
 '''
-This script calculates the lifetime energy savings of the ThermoBeat system, considering factors such as battery capacity, battery degradation rate, and device power consumption. It uses the teg_output and ltc3108_output functions from the simulation module, as well as the energy_harvested function from the harvested energy estimation module.
+This script calculates the lifetime energy savings of the ThermoBeat system, considering factors such as battery capacity, battery degradation rate, and device power consumption. It uses the output power of a HarvesterModel from the simulation module (DEFAULT_MODEL unless another model is given).
 
 The script generates a plot showing the lifetime energy savings for a range of battery capacities, given a specific temperature gradient and duration in years.
 
@@ -14,11 +13,9 @@ python lifetime_savings.py
 A window with the plot should appear, showing the relationship between lifetime energy savings and the input parameters of battery capacity, temperature gradient, and duration in years.
 '''
 
-def calculate_lifetime_savings(temperature_gradient, battery_capacity, battery_degradation_rate, device_power_consumption, duration_years):
-    output_voltage, output_current = simulation.teg_output(temperature_gradient, 50.4, 3.11)
-    output_voltage, output_current = simulation.ltc3108_output(output_voltage, output_current)
-
-    energy_harvested_per_year = 365 * 24 * harvested_energy_estimation.energy_harvested(temperature_gradient, 1, output_voltage, output_current)
+def calculate_lifetime_savings(temperature_gradient, battery_capacity, battery_degradation_rate, device_power_consumption, duration_years, model=simulation.DEFAULT_MODEL):
+    # All arguments except duration_years (and the model's coefficients) may be arrays, in which case every scenario is evaluated elementwise.
+    energy_harvested_per_year = 365 * 24 * model.output_power_array(temperature_gradient)
     battery_energy_capacity = battery_capacity * 365 * 24
 
     battery_remaining_capacity = battery_energy_capacity
@@ -1,10 +1,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import simulation
-import harvested_energy_estimation
 
 '''
-This script calculates the optimal temperature gradient required for different device power consumption scenarios. It uses the teg_output and ltc3108_output functions from the simulation module, as well as the energy_harvested function from the harvested_energy_estimation module.
+This script calculates the optimal temperature gradient required for different device power consumption scenarios. It uses the output power of a HarvesterModel from the simulation module (DEFAULT_MODEL unless another model is given).
+
+The required gradient is found by inverting the harvest chain rather than scanning a grid of gradients. With a constant converter efficiency the harvested power is proportional to the squared gradient and the inverse is closed form; when the HarvesterModel's efficiency is a function of the converter input (e.g. an interpolated efficiency table), the gradient is found by bracketed bisection on [0, max_gradient]. Both paths are vectorized over arrays of device power targets. Targets that cannot be met within max_gradient are marked with UNREACHABLE (NaN).
 
 The script generates a plot showing the relationship between the optimal temperature gradient and device power consumption.
 
@@ -14,26 +15,46 @@ python optimal_gradient.py
 A window with the plot should appear, showing the optimal temperature gradient required for different device power consumption scenarios. This information can be useful for determining the minimum temperature gradient needed for the ThermoBeat system to operate efficiently under various conditions.
 '''
 
-def find_optimal_gradient(device_power_consumption_mW):
-    temperature_gradients = np.linspace(0.5, 10, 100)
-    required_gradients = []
+UNREACHABLE = np.nan
 
-    for temperature_gradient in temperature_gradients:
-        output_voltage, output_current = simulation.teg_output(temperature_gradient, 50.4, 3.11)
-        output_voltage, output_current = simulation.ltc3108_output(output_voltage, output_current)
+def solve_required_gradient(device_power_consumption_mW, model=simulation.DEFAULT_MODEL, max_gradient=10.0, tolerance=1e-9, max_iterations=200):
+    device_power_consumption_mW = np.asarray(device_power_consumption_mW, dtype=np.float64)
 
-        harvested_energy_mW = output_voltage * output_current
-        if harvested_energy_mW >= device_power_consumption_mW:
-            required_gradients.append(temperature_gradient)
-            break
-    return required_gradients
+    if model.power_gain is not None:
+        # Harvested power is power_gain * gradient^2, so the required gradient is closed form.
+        with np.errstate(divide="ignore", invalid="ignore"):
+            required_gradients = np.sqrt(np.maximum(device_power_consumption_mW, 0) / model.power_gain)
+        required_gradients = np.where(device_power_consumption_mW <= 0, 0.0, required_gradients)
+    else:
+        harvested_power = model.output_power_array
 
-def plot_optimal_gradient(device_power_consumptions_mW):
-    optimal_gradients = []
+        targets = device_power_consumption_mW.ravel()
+        lower = np.zeros_like(targets)
+        upper = np.full_like(targets, max_gradient)
+        reachable = harvested_power(upper) >= targets
+        active = np.flatnonzero(reachable & (targets > 0))
+        upper[targets <= 0] = 0.0
+
+        # Bisection keeps harvested_power(lower) < target <= harvested_power(upper) for every active target.
+        for _ in range(max_iterations):
+            active = active[upper[active] - lower[active] > tolerance]
+            if not active.size:
+                break
+            middle = 0.5 * (lower[active] + upper[active])
+            sufficient = harvested_power(middle) >= targets[active]
+            upper[active[sufficient]] = middle[sufficient]
+            lower[active[~sufficient]] = middle[~sufficient]
+
+        required_gradients = np.where(reachable, upper, UNREACHABLE).reshape(device_power_consumption_mW.shape)
 
-    for device_power_consumption_mW in device_power_consumptions_mW:
-        optimal_gradient = find_optimal_gradient(device_power_consumption_mW)
-        optimal_gradients.append(optimal_gradient)
+    required_gradients = np.where(required_gradients <= max_gradient, required_gradients, UNREACHABLE)
+    return required_gradients.item() if required_gradients.ndim == 0 else required_gradients
+
+def find_optimal_gradient(device_power_consumption_mW, model=simulation.DEFAULT_MODEL, tolerance=1e-9):
+    return solve_required_gradient(device_power_consumption_mW, model=model, tolerance=tolerance)
+
+def plot_optimal_gradient(device_power_consumptions_mW):
+    optimal_gradients = find_optimal_gradient(device_power_consumptions_mW)
 
     plt.plot(device_power_consumptions_mW, optimal_gradients)
     plt.xlabel("Device Power Consumption (mW)")
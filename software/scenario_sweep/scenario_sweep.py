@@ -0,0 +1,162 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
+import simulation
+import battery_life_estimation
+import lifetime_savings
+
+'''
+This script runs Monte Carlo sweeps over uncertain ThermoBeat parameters to obtain fleet-level confidence intervals. The TEG coefficients (nominally 50.4 mV/°C and 3.11 mA/°C), the LTC3108 conversion efficiency, the battery degradation rate and the device load are sampled from user-supplied distributions, and every scenario is evaluated with the battery_life_hours function from the battery life estimation module and the calculate_lifetime_savings function from the lifetime savings module.
+
+Scenarios are split into chunks that are sampled and evaluated as NumPy arrays inside worker processes of a ProcessPoolExecutor. Each worker writes its metrics directly into a shared-memory result buffer, so only chunk bounds and seeds are sent between processes.
+
+A distribution is given as a number (a fixed value) or as a tuple: ("normal", mean, std), ("uniform", low, high), ("lognormal", mean, sigma) or ("triangular", left, mode, right).
+
+To print the percentiles for the example distributions below, execute the following command from the software/scenario_sweep folder:
+python scenario_sweep.py
+'''
+
+SCENARIO_PARAMETERS = ("open_circuit_voltage_per_gradient", "short_circuit_current_per_gradient", "efficiency", "battery_degradation_rate", "device_power_consumption_mW")
+SCENARIO_METRICS = ("battery_life_hours", "lifetime_savings_mWh", "battery_energy_after_horizon_mWh")
+
+DEFAULT_DISTRIBUTIONS = {
+    "open_circuit_voltage_per_gradient": simulation.DEFAULT_MODEL.open_circuit_voltage_per_gradient,
+    "short_circuit_current_per_gradient": simulation.DEFAULT_MODEL.short_circuit_current_per_gradient,
+    "efficiency": simulation.DEFAULT_MODEL.efficiency,
+    "battery_degradation_rate": 0.02,
+    "device_power_consumption_mW": 336,
+}
+
+def sample_parameter(distribution, size, rng):
+    if np.isscalar(distribution):
+        return np.full(size, distribution, dtype=np.float64)
+
+    kind, *arguments = distribution
+    if kind == "normal":
+        return rng.normal(*arguments, size=size)
+    if kind == "uniform":
+        return rng.uniform(*arguments, size=size)
+    if kind == "lognormal":
+        return rng.lognormal(*arguments, size=size)
+    if kind == "triangular":
+        return rng.triangular(*arguments, size=size)
+    raise ValueError(f"Unknown distribution: {kind}")
+
+def sample_scenarios(distributions, size, rng):
+    distributions = dict(DEFAULT_DISTRIBUTIONS, **distributions)
+    return {name: sample_parameter(distributions[name], size, rng) for name in SCENARIO_PARAMETERS}
+
+def evaluate_scenarios(scenarios, temperature_gradient, battery_capacity_mAh, battery_voltage, duration_years, horizon_hours):
+    # One model holds the whole chunk of devices; its gains broadcast over the scenarios.
+    model = simulation.HarvesterModel(scenarios["open_circuit_voltage_per_gradient"], scenarios["short_circuit_current_per_gradient"], efficiency=scenarios["efficiency"])
+
+    battery_life = battery_life_estimation.battery_life_hours(
+        temperature_gradient, battery_capacity_mAh, battery_voltage, scenarios["device_power_consumption_mW"], model=model)
+
+    battery_energy_capacity_mWh = battery_capacity_mAh * battery_voltage
+    teg_energy, battery_energy = lifetime_savings.calculate_lifetime_savings(
+        temperature_gradient, battery_energy_capacity_mWh, scenarios["battery_degradation_rate"], scenarios["device_power_consumption_mW"], duration_years, model=model)
+
+    # With constant inputs the power management trajectory is a single clamped line starting from a full battery.
+    harvest_power_mW = model.output_power_array(temperature_gradient)
+    net_power_mW = harvest_power_mW - scenarios["device_power_consumption_mW"]
+    battery_energy_after_horizon = np.clip(battery_energy_capacity_mWh + net_power_mW * horizon_hours, 0, battery_energy_capacity_mWh)
+
+    return {
+        "battery_life_hours": battery_life,
+        "lifetime_savings_mWh": teg_energy - battery_energy,
+        "battery_energy_after_horizon_mWh": battery_energy_after_horizon,
+    }
+
+def _run_chunk(shared_memory_name, num_scenarios, start, stop, seed_sequence, distributions, settings):
+    buffer = shared_memory.SharedMemory(name=shared_memory_name)
+    try:
+        # The view must be gone before the buffer is closed, even when evaluation raises.
+        results = np.ndarray((num_scenarios, len(SCENARIO_METRICS)), dtype=np.float64, buffer=buffer.buf)
+        try:
+            rng = np.random.default_rng(seed_sequence)
+            scenarios = sample_scenarios(distributions, stop - start, rng)
+            metrics = evaluate_scenarios(scenarios, **settings)
+            for column, name in enumerate(SCENARIO_METRICS):
+                results[start:stop, column] = metrics[name]
+        finally:
+            del results
+    finally:
+        buffer.close()
+    return stop - start
+
+def run_scenario_sweep(distributions, num_scenarios, temperature_gradient=3, battery_capacity_mAh=1200, battery_voltage=3.7, duration_years=10, horizon_hours=72, percentiles=(5, 50, 95), chunk_size=10000, num_workers=None, seed=0, return_samples=False):
+    """
+    Sample and evaluate scenarios in parallel and report percentiles of each metric.
+
+    Args:
+    distributions (dict): Distributions keyed by the names in SCENARIO_PARAMETERS. Missing parameters use DEFAULT_DISTRIBUTIONS.
+    num_scenarios (int): The number of scenarios to sample.
+    temperature_gradient (float): The temperature gradient across the TEG module (in °C).
+    battery_capacity_mAh (float): The battery capacity (in mAh).
+    battery_voltage (float): The battery voltage (in V).
+    duration_years (int): The lifetime used for the lifetime savings (in years).
+    horizon_hours (float): The horizon of the power management simulation (in hours).
+    percentiles (tuple): The percentiles to report.
+    chunk_size (int): The number of scenarios evaluated per task.
+    num_workers (int): The number of worker processes. Defaults to the number of CPUs.
+    seed (int): The seed of the scenario sampling; results do not depend on num_workers.
+    return_samples (bool): Also return the per-scenario metrics as an array with columns SCENARIO_METRICS.
+
+    Returns:
+    dict: For every metric in SCENARIO_METRICS, a dictionary mapping percentile to value. With return_samples, a tuple of that dictionary and the metric array.
+    """
+    unknown = set(distributions) - set(SCENARIO_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown scenario parameters: {sorted(unknown)}")
+
+    settings = {
+        "temperature_gradient": temperature_gradient,
+        "battery_capacity_mAh": battery_capacity_mAh,
+        "battery_voltage": battery_voltage,
+        "duration_years": duration_years,
+        "horizon_hours": horizon_hours,
+    }
+    bounds = [(start, min(start + chunk_size, num_scenarios)) for start in range(0, num_scenarios, chunk_size)]
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(bounds))
+
+    num_bytes = max(num_scenarios * len(SCENARIO_METRICS) * np.dtype(np.float64).itemsize, 1)
+    buffer = shared_memory.SharedMemory(create=True, size=num_bytes)
+    try:
+        with ProcessPoolExecutor(max_workers=num_workers or os.cpu_count()) as executor:
+            futures = [executor.submit(_run_chunk, buffer.name, num_scenarios, start, stop, seed_sequence, distributions, settings)
+                       for (start, stop), seed_sequence in zip(bounds, seed_sequences)]
+            for future in futures:
+                future.result()
+
+        results = np.ndarray((num_scenarios, len(SCENARIO_METRICS)), dtype=np.float64, buffer=buffer.buf).copy()
+    finally:
+        buffer.close()
+        buffer.unlink()
+
+    # Battery life is infinite whenever harvesting covers the load, so use order statistics rather than interpolation.
+    summary = {
+        name: dict(zip(percentiles, np.percentile(results[:, column], percentiles, method="nearest").tolist()))
+        for column, name in enumerate(SCENARIO_METRICS)
+    }
+
+    if return_samples:
+        return summary, results
+    return summary
+
+if __name__ == "__main__":
+    distributions = {
+        "open_circuit_voltage_per_gradient": ("normal", 50.4, 2.5),
+        "short_circuit_current_per_gradient": ("normal", 3.11, 0.15),
+        "efficiency": ("uniform", 0.6, 0.85),
+        "battery_degradation_rate": ("triangular", 0.01, 0.02, 0.05),
+        "device_power_consumption_mW": ("lognormal", np.log(336), 0.25),
+    }
+
+    summary = run_scenario_sweep(distributions, 100000, temperature_gradient=0.5)
+
+    for metric, values in summary.items():
+        print(metric)
+        for percentile, value in values.items():
+            print(f"  p{percentile}: {value:.2f}")
@@ -0,0 +1,120 @@
+import os
+import threading
+import numpy as np
+
+# Parsed efficiency tables keyed by absolute path, stored with the (mtime, size) they were parsed at.
+_TABLE_CACHE = {}
+_TABLE_CACHE_LOCK = threading.Lock()
+
+class EfficiencyTable:
+    """
+    Converter efficiency interpolated from a table over input voltage and, optionally, input power.
+
+    Instances are callables of (input_voltage, input_power) and can be passed as the efficiency of
+    simulation.ltc3108_output_array, simulation.simulate_harvest or teg_boost_simulation.boost_converter_output.
+    Inputs outside the table are clamped to its edges.
+    """
+
+    def __init__(self, input_voltages, efficiencies, input_powers=None):
+        """
+        Args:
+        input_voltages (np.ndarray): The increasing input voltage grid (in mV).
+        efficiencies (np.ndarray): The efficiency (0 to 1) at each grid point, with shape (len(input_voltages),) or (len(input_voltages), len(input_powers)).
+        input_powers (np.ndarray): The increasing input power grid (in mW), or None for a voltage-only table.
+        """
+        self.input_voltages = np.ascontiguousarray(input_voltages, dtype=np.float64)
+        self.input_powers = None if input_powers is None else np.ascontiguousarray(input_powers, dtype=np.float64)
+        self.efficiencies = np.ascontiguousarray(efficiencies, dtype=np.float64)
+
+        expected_shape = self.input_voltages.shape if self.input_powers is None else self.input_voltages.shape + self.input_powers.shape
+        if self.efficiencies.shape != expected_shape:
+            raise ValueError(f"Efficiency table has shape {self.efficiencies.shape}, expected {expected_shape}")
+
+    def __call__(self, input_voltage, input_power):
+        input_voltage = np.asarray(input_voltage, dtype=np.float64)
+        if self.input_powers is None:
+            return np.interp(input_voltage, self.input_voltages, self.efficiencies)
+
+        input_voltage, input_power = np.broadcast_arrays(input_voltage, np.asarray(input_power, dtype=np.float64))
+        voltage_index, voltage_weight = _grid_position(self.input_voltages, input_voltage)
+        power_index, power_weight = _grid_position(self.input_powers, input_power)
+
+        table = self.efficiencies
+        lower = table[voltage_index, power_index] * (1 - power_weight) + table[voltage_index, power_index + 1] * power_weight
+        upper = table[voltage_index + 1, power_index] * (1 - power_weight) + table[voltage_index + 1, power_index + 1] * power_weight
+        return lower * (1 - voltage_weight) + upper * voltage_weight
+
+def _grid_position(grid, values):
+    """
+    Return the lower cell index and the interpolation weight of each value on an increasing grid, clamped to its edges.
+    """
+    if len(grid) == 1:
+        return np.zeros(values.shape, dtype=np.intp), np.zeros(values.shape)
+    index = np.clip(np.searchsorted(grid, values, side="right") - 1, 0, len(grid) - 2)
+    weight = np.clip((values - grid[index]) / (grid[index + 1] - grid[index]), 0.0, 1.0)
+    return index, weight
+
+def parse_efficiency_table(file_path):
+    """
+    Parse an efficiency table from a datasheet or bench CSV file.
+
+    The file has a header row with an input_voltage_mV column, an optional input_power_mW column, and either an
+    efficiency column (0 to 1) or an efficiency_percent column. With input_power_mW the rows must cover a full
+    (voltage, power) grid in any order.
+
+    Args:
+    file_path (str): Path to the CSV file.
+
+    Returns:
+    EfficiencyTable: The parsed efficiency table.
+    """
+    data = np.genfromtxt(file_path, delimiter=",", names=True, dtype=np.float64, ndmin=1)
+    names = data.dtype.names
+
+    if "efficiency" in names:
+        efficiencies = data["efficiency"]
+    elif "efficiency_percent" in names:
+        efficiencies = data["efficiency_percent"] / 100.0
+    else:
+        raise ValueError(f"{file_path} has no efficiency or efficiency_percent column")
+
+    if "input_power_mW" not in names:
+        order = np.argsort(data["input_voltage_mV"])
+        return EfficiencyTable(data["input_voltage_mV"][order], efficiencies[order])
+
+    input_voltages, voltage_index = np.unique(data["input_voltage_mV"], return_inverse=True)
+    input_powers, power_index = np.unique(data["input_power_mW"], return_inverse=True)
+    grid = np.full((len(input_voltages), len(input_powers)), np.nan)
+    grid[voltage_index, power_index] = efficiencies
+    if np.isnan(grid).any():
+        raise ValueError(f"{file_path} does not cover a full input voltage x input power grid")
+
+    return EfficiencyTable(input_voltages, grid, input_powers)
+
+def load_efficiency_table(file_path):
+    """
+    Return the efficiency table for a CSV file, parsing it only when the file is new or has changed.
+
+    Args:
+    file_path (str): Path to the CSV file.
+
+    Returns:
+    EfficiencyTable: The cached or freshly parsed efficiency table.
+    """
+    file_path = os.path.abspath(file_path)
+    stat = os.stat(file_path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    with _TABLE_CACHE_LOCK:
+        cached = _TABLE_CACHE.get(file_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    table = parse_efficiency_table(file_path)
+    with _TABLE_CACHE_LOCK:
+        _TABLE_CACHE[file_path] = (signature, table)
+    return table
+
+def clear_efficiency_table_cache():
+    with _TABLE_CACHE_LOCK:
+        _TABLE_CACHE.clear()
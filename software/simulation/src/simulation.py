@@ -1,6 +1,101 @@
 import numpy as np
 import matplotlib.pyplot as plt
 
+# Constants for LTC3108 simulation
+LTC3108_OUTPUT_VOLTAGE = 3300  # mV
+LTC3108_EFFICIENCY = 0.8  # Assumed efficiency
+
+# Record layout returned by simulate_harvest, one record per evaluated point.
+HARVEST_DTYPE = np.dtype([
+    ('input_voltage', np.float64),   # mV
+    ('input_current', np.float64),   # mA
+    ('output_voltage', np.float64),  # mV
+    ('output_current', np.float64),  # mA
+    ('output_power', np.float64),    # mW
+    ('energy', np.float64),          # mWh
+])
+
+def _unwrap(value):
+    """
+    Return a 0-d array as a plain Python scalar so the scalar API keeps returning floats.
+    """
+    value = np.asarray(value)
+    return value.item() if value.ndim == 0 else value
+
+def teg_output_array(temperature_gradients, open_circuit_voltage_per_gradient, short_circuit_current_per_gradient):
+    """
+    Calculate the TEG module's output voltage and current for arrays of temperature gradients and TEG coefficients.
+
+    All arguments are broadcast against each other with NumPy rules, so a column of gradients and a row of
+    coefficients evaluate the full (gradient, device) grid in one call.
+
+    Args:
+    temperature_gradients (array_like): The temperature gradients across the TEG module (in °C).
+    open_circuit_voltage_per_gradient (array_like): The open-circuit voltage per degree Celsius of temperature gradient (in mV/°C).
+    short_circuit_current_per_gradient (array_like): The short-circuit current per degree Celsius of temperature gradient (in mA/°C).
+
+    Returns:
+    tuple: A tuple of arrays containing the output voltages (in mV) and output currents (in mA), with the broadcast shape of the inputs.
+    """
+    temperature_gradients = np.asarray(temperature_gradients, dtype=np.float64)
+    voltages = np.multiply(open_circuit_voltage_per_gradient, temperature_gradients)
+    currents = np.multiply(short_circuit_current_per_gradient, temperature_gradients)
+
+    return voltages, currents
+
+def ltc3108_output_array(input_voltages, input_currents, output_voltage=LTC3108_OUTPUT_VOLTAGE, efficiency=LTC3108_EFFICIENCY):
+    """
+    Calculate the LTC3108 boost converter's output voltage and current for arrays of input voltages and currents.
+
+    Args:
+    input_voltages (array_like): The input voltages to the LTC3108 boost converter (in mV).
+    input_currents (array_like): The input currents to the LTC3108 boost converter (in mA).
+    output_voltage (array_like): The regulated output voltage of the converter (in mV).
+    efficiency (array_like or callable): The conversion efficiency of the converter (0 to 1), or a function of the input voltage (in mV) and input power (in mW) returning it.
+
+    Returns:
+    tuple: A tuple of arrays containing the output voltages (in mV) and output currents (in mA), with the broadcast shape of the inputs.
+    """
+    input_power = np.multiply(input_voltages, input_currents)  # mW
+    if callable(efficiency):
+        efficiency = efficiency(input_voltages, input_power)
+    output_power = input_power * efficiency  # mW
+    output_current = output_power / output_voltage  # mA
+    output_voltages = np.broadcast_to(np.asarray(output_voltage, dtype=np.float64), output_current.shape)
+
+    return output_voltages, output_current
+
+def simulate_harvest(temperature_gradients, open_circuit_voltage_per_gradient, short_circuit_current_per_gradient, output_voltage=LTC3108_OUTPUT_VOLTAGE, efficiency=LTC3108_EFFICIENCY, duration=1.0):
+    """
+    Evaluate the full TEG -> LTC3108 chain for broadcastable arrays of gradients, coefficients and converter parameters.
+
+    Args:
+    temperature_gradients (array_like): The temperature gradients across the TEG module (in °C).
+    open_circuit_voltage_per_gradient (array_like): The open-circuit voltage per degree Celsius of temperature gradient (in mV/°C).
+    short_circuit_current_per_gradient (array_like): The short-circuit current per degree Celsius of temperature gradient (in mA/°C).
+    output_voltage (array_like): The regulated output voltage of the LTC3108 boost converter (in mV).
+    efficiency (array_like or callable): The conversion efficiency of the LTC3108 boost converter (0 to 1), or a function of the input voltage and input power returning it.
+    duration (array_like): The duration of energy harvesting used for the energy field (in hours).
+
+    Returns:
+    np.ndarray: A structured array with dtype HARVEST_DTYPE and the broadcast shape of all inputs.
+    """
+    input_voltages, input_currents = teg_output_array(temperature_gradients, open_circuit_voltage_per_gradient, short_circuit_current_per_gradient)
+    output_voltages, output_currents = ltc3108_output_array(input_voltages, input_currents, output_voltage, efficiency)
+    output_power = output_voltages * output_currents  # mW
+    energy = output_power * duration  # mWh
+
+    shape = np.broadcast(input_voltages, output_voltages, energy).shape
+    results = np.empty(shape, dtype=HARVEST_DTYPE)
+    results['input_voltage'] = input_voltages
+    results['input_current'] = input_currents
+    results['output_voltage'] = output_voltages
+    results['output_current'] = output_currents
+    results['output_power'] = output_power
+    results['energy'] = energy
+
+    return results
+
 def teg_output(temperature_gradient, open_circuit_voltage_per_gradient, short_circuit_current_per_gradient):
     """
     Calculate the TEG module's output voltage and current for a given temperature gradient.
@@ -13,31 +108,147 @@ def teg_output(temperature_gradient, open_circuit_voltage_per_gradient, short_ci
     Returns:
     tuple: A tuple containing the output voltage (in mV) and output current (in mA) for the given temperature gradient.
     """
-    voltage = open_circuit_voltage_per_gradient * temperature_gradient
-    current = short_circuit_current_per_gradient * temperature_gradient
+    voltage, current = teg_output_array(temperature_gradient, open_circuit_voltage_per_gradient, short_circuit_current_per_gradient)
 
-    return voltage, current
+    return _unwrap(voltage), _unwrap(current)
 
-def ltc3108_output(input_voltage, input_current):
+def ltc3108_output(input_voltage, input_current, efficiency=LTC3108_EFFICIENCY):
     """
     Calculate the LTC3108 boost converter's output voltage and current for a given input voltage and current.
 
     Args:
     input_voltage (float): The input voltage to the LTC3108 boost converter (in mV).
     input_current (float): The input current to the LTC3108 boost converter (in mA).
+    efficiency (float or callable): The conversion efficiency, or a converter model such as converter_model.EfficiencyTable.
 
     Returns:
     tuple: A tuple containing the output voltage (in mV) and output current (in mA) for the given input voltage and current.
     """
-    # Constants for LTC3108 simulation
-    output_voltage = 3300  # mV
-    efficiency = 0.8  # Assumed efficiency
+    output_voltage, output_current = ltc3108_output_array(input_voltage, input_current, efficiency=efficiency)
 
-    input_power = input_voltage * input_current  # mW
-    output_power = input_power * efficiency  # mW
-    output_current = output_power / output_voltage  # mA
+    return _unwrap(output_voltage), _unwrap(output_current)
+
+# Scale factors from mV to the units a HarvesterModel reports its output voltage in.
+VOLTAGE_UNIT_SCALES = {'mV': 1.0, 'V': 1e-3}
+
+class HarvesterModel:
+    """
+    Immutable parameters of the TEG -> LTC3108 chain with its derived constants computed once.
+
+    With a constant efficiency the chain collapses to output power = power_gain * gradient² and
+    output current = output_current_gain * gradient², so both the scalar and the batch paths cost one
+    multiply per point. As in the existing modules, the output current is the output power divided by the
+    output voltage expressed in output_voltage_unit. With an efficiency callable (e.g. converter_model.EfficiencyTable) the batch path
+    evaluates the converter model on the TEG output instead. Coefficients may be arrays to describe a
+    population of devices; they broadcast against the gradients.
+    """
+
+    __slots__ = ('open_circuit_voltage_per_gradient', 'short_circuit_current_per_gradient', 'output_voltage', 'efficiency',
+                 'output_voltage_unit', 'output_voltage_scale', 'teg_power_gain', 'power_gain', 'output_current_gain')
+
+    def __init__(self, open_circuit_voltage_per_gradient=50.4, short_circuit_current_per_gradient=3.11, output_voltage=LTC3108_OUTPUT_VOLTAGE, efficiency=LTC3108_EFFICIENCY, output_voltage_unit='mV'):
+        """
+        Args:
+        open_circuit_voltage_per_gradient (float or np.ndarray): The open-circuit voltage per degree Celsius of temperature gradient (in mV/°C).
+        short_circuit_current_per_gradient (float or np.ndarray): The short-circuit current per degree Celsius of temperature gradient (in mA/°C).
+        output_voltage (float): The regulated output voltage of the LTC3108 boost converter (in mV).
+        efficiency (float, np.ndarray or callable): The conversion efficiency, or a function of the input voltage (mV) and input power (mW) returning it.
+        output_voltage_unit (str): The unit output voltages are reported in, 'mV' or 'V'.
+        """
+        if output_voltage_unit not in VOLTAGE_UNIT_SCALES:
+            raise ValueError(f"Unknown output voltage unit: {output_voltage_unit}")
+
+        teg_power_gain = _unwrap(np.multiply(open_circuit_voltage_per_gradient, short_circuit_current_per_gradient))  # mW/°C²
+        power_gain = None if callable(efficiency) else teg_power_gain * efficiency  # mW/°C²
+
+        set_slot = object.__setattr__
+        set_slot(self, 'open_circuit_voltage_per_gradient', open_circuit_voltage_per_gradient)
+        set_slot(self, 'short_circuit_current_per_gradient', short_circuit_current_per_gradient)
+        set_slot(self, 'output_voltage', output_voltage)
+        set_slot(self, 'efficiency', efficiency)
+        set_slot(self, 'output_voltage_unit', output_voltage_unit)
+        set_slot(self, 'output_voltage_scale', VOLTAGE_UNIT_SCALES[output_voltage_unit])
+        set_slot(self, 'teg_power_gain', teg_power_gain)
+        set_slot(self, 'power_gain', power_gain)
+        set_slot(self, 'output_current_gain', None if power_gain is None else power_gain / (output_voltage * self.output_voltage_scale))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return (type(self), (self.open_circuit_voltage_per_gradient, self.short_circuit_current_per_gradient, self.output_voltage, self.efficiency, self.output_voltage_unit))
 
-    return output_voltage, output_current
+    def __repr__(self):
+        return (f"{type(self).__name__}(open_circuit_voltage_per_gradient={self.open_circuit_voltage_per_gradient!r}, "
+                f"short_circuit_current_per_gradient={self.short_circuit_current_per_gradient!r}, output_voltage={self.output_voltage!r}, "
+                f"efficiency={self.efficiency!r}, output_voltage_unit={self.output_voltage_unit!r})")
+
+    def replace(self, **changes):
+        """
+        Return a copy of the model with some parameters changed.
+        """
+        parameters = {name: getattr(self, name) for name in ('open_circuit_voltage_per_gradient', 'short_circuit_current_per_gradient', 'output_voltage', 'efficiency', 'output_voltage_unit')}
+        parameters.update(changes)
+        return type(self)(**parameters)
+
+    def teg_output(self, temperature_gradient):
+        """
+        Return the TEG output voltage (in mV) and current (in mA) for a temperature gradient (in °C).
+        """
+        return (self.open_circuit_voltage_per_gradient * temperature_gradient,
+                self.short_circuit_current_per_gradient * temperature_gradient)
+
+    def output_power(self, temperature_gradient):
+        """
+        Return the converter output power (in mW) for a scalar temperature gradient (in °C).
+        """
+        if self.power_gain is None:
+            return _unwrap(self.output_power_array(temperature_gradient))
+        return self.power_gain * temperature_gradient * temperature_gradient
+
+    def output(self, temperature_gradient):
+        """
+        Return the converter output voltage (in output_voltage_unit) and current for a scalar temperature gradient (in °C).
+        """
+        output_voltage = self.output_voltage * self.output_voltage_scale
+        if self.output_current_gain is not None:
+            return output_voltage, self.output_current_gain * temperature_gradient * temperature_gradient
+        return output_voltage, self.output_power(temperature_gradient) / output_voltage
+
+    def output_power_array(self, temperature_gradients):
+        """
+        Return the converter output power (in mW) for an array of temperature gradients (in °C).
+        """
+        squared_gradients = np.square(np.asarray(temperature_gradients, dtype=np.float64))
+        if self.power_gain is not None:
+            return self.power_gain * squared_gradients
+
+        input_voltages = np.multiply(self.open_circuit_voltage_per_gradient, temperature_gradients)
+        input_power = self.teg_power_gain * squared_gradients
+        return input_power * self.efficiency(input_voltages, input_power)
+
+    def output_current_array(self, temperature_gradients):
+        """
+        Return the converter output current for an array of temperature gradients (in °C).
+        """
+        if self.output_current_gain is not None:
+            return self.output_current_gain * np.square(np.asarray(temperature_gradients, dtype=np.float64))
+        return self.output_power_array(temperature_gradients) / (self.output_voltage * self.output_voltage_scale)
+
+    def simulate(self, temperature_gradients, duration=1.0):
+        """
+        Evaluate the full chain for an array of temperature gradients (in °C).
+
+        Returns:
+        np.ndarray: A structured array with dtype HARVEST_DTYPE. Voltages are in mV regardless of output_voltage_unit.
+        """
+        return simulate_harvest(temperature_gradients, self.open_circuit_voltage_per_gradient, self.short_circuit_current_per_gradient, self.output_voltage, self.efficiency, duration)
+
+# The ThermoBeat TEG module (50.4 mV/°C, 3.11 mA/°C) with the LTC3108 at 3.3 V and 80% efficiency.
+DEFAULT_MODEL = HarvesterModel()
 
 def simulate_temperature_gradients(temperature_gradients, open_circuit_voltage_per_gradient, short_circuit_current_per_gradient):
     """
@@ -51,28 +262,34 @@ def simulate_temperature_gradients(temperature_gradients, open_circuit_voltage_p
     Returns:
     dict: A dictionary containing the simulation results (input voltage, input current, output voltage, and output current).
     """
-    input_voltages = []
-    input_currents = []
-    output_voltages = []
-    output_currents = []
-
-    for gradient in temperature_gradients:
-        input_voltage, input_current = teg_output(gradient, open_circuit_voltage_per_gradient, short_circuit_current_per_gradient)
-        output_voltage, output_current = ltc3108_output(input_voltage, input_current)
-
-        input_voltages.append(input_voltage)
-        input_currents.append(input_current)
-        output_voltages.append(output_voltage)
-        output_currents.append(output_current)
-
-    results = {
-        'input_voltages': input_voltages,
-        'input_currents': input_currents,
-        'output_voltages': output_voltages,
-        'output_currents': output_currents,
+    results = simulate_harvest(temperature_gradients, open_circuit_voltage_per_gradient, short_circuit_current_per_gradient)
+
+    return {
+        'input_voltages': results['input_voltage'],
+        'input_currents': results['input_current'],
+        'output_voltages': results['output_voltage'],
+        'output_currents': results['output_current'],
     }
 
-    return results
+def plot_simulation(temperature_gradients, results):
+    """
+    Plot the TEG module and LTC3108 boost converter outputs vs. temperature gradient.
 
-def plot_simulation
+    Args:
+    temperature_gradients (np.ndarray): An array containing the temperature gradient values.
+    results (dict): The simulation results returned by simulate_temperature_gradients.
+    """
+    plt.figure()
+    plt.plot(temperature_gradients, results['input_voltages'], label='TEG Voltage (mV)')
+    plt.plot(temperature_gradients, results['input_currents'], label='TEG Current (mA)')
+    plt.xlabel('Temperature Gradient (°C)')
+    plt.ylabel('Output')
+    plt.legend()
+    plt.title('TEG Module Output vs. Temperature Gradient')
 
+    plt.figure()
+    plt.plot(temperature_gradients, results['output_currents'], label='Boost Converter Output Current (mA)')
+    plt.xlabel('Temperature Gradient (°C)')
+    plt.ylabel('Output Current (mA)')
+    plt.legend()
+    plt.title('Boost Converter Output Current vs. Temperature Gradient')
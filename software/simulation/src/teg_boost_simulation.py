@@ -1,5 +1,9 @@
 import numpy as np
 import matplotlib.pyplot as plt
+import simulation
+
+# Constants obtained from TEG specifications (mV/°C and mA/°C) and the LTC3108 specifications, with the output voltage reported in V.
+TEG_BOOST_MODEL = simulation.HarvesterModel(50.4 / 3, 3.11 / 3, output_voltage_unit='V')
 
 def teg_output(temperature_gradient):
     """
@@ -11,31 +15,25 @@ def teg_output(temperature_gradient):
     Returns:
     (float, float): A tuple containing the output voltage (mV) and current (mA) of the TEG module.
     """
-    # Constants obtained from TEG specifications
-    open_circuit_voltage_per_deg = 50.4 / 3  # mV/°C
-    short_circuit_current_per_deg = 3.11 / 3  # mA/°C
-
-    voltage = open_circuit_voltage_per_deg * temperature_gradient
-    current = short_circuit_current_per_deg * temperature_gradient
-
-    return voltage, current
+    return TEG_BOOST_MODEL.teg_output(temperature_gradient)
 
-def boost_converter_output(teg_voltage, teg_current):
+def boost_converter_output(teg_voltage, teg_current, conversion_efficiency=TEG_BOOST_MODEL.efficiency):
     """
     Calculate the output voltage and current of the LTC3108 boost converter for a given input voltage and current.
 
     Args:
     teg_voltage (float): The input voltage from the TEG module in mV.
     teg_current (float): The input current from the TEG module in mA.
+    conversion_efficiency (float or callable): The conversion efficiency, or a function of the input voltage (mV) and input power (mW) such as converter_model.EfficiencyTable.
 
     Returns:
     (float, float): A tuple containing the output voltage (V) and current (mA) of the LTC3108 boost converter.
     """
-    # Constants obtained from LTC3108 specifications
-    output_voltage = 3.3  # V
-    conversion_efficiency = 0.8
+    output_voltage = TEG_BOOST_MODEL.output_voltage * TEG_BOOST_MODEL.output_voltage_scale  # V
 
     input_power = teg_voltage * teg_current  # mW
+    if callable(conversion_efficiency):
+        conversion_efficiency = conversion_efficiency(teg_voltage, input_power)
     output_power = input_power * conversion_efficiency  # mW
 
     output_current = output_power / output_voltage  # mA
@@ -45,19 +43,8 @@ def boost_converter_output(teg_voltage, teg_current):
 def main():
     temperature_gradients = np.linspace(1, 10, 10)  # 1 to 10 degrees Celsius
 
-    teg_voltages = []
-    teg_currents = []
-    boost_output_voltages = []
-    boost_output_currents = []
-
-    for gradient in temperature_gradients:
-        teg_voltage, teg_current = teg_output(gradient)
-        teg_voltages.append(teg_voltage)
-        teg_currents.append(teg_current)
-
-        output_voltage, output_current = boost_converter_output(teg_voltage, teg_current)
-        boost_output_voltages.append(output_voltage)
-        boost_output_currents.append(output_current)
+    teg_voltages, teg_currents = TEG_BOOST_MODEL.teg_output(temperature_gradients)
+    boost_output_currents = TEG_BOOST_MODEL.output_current_array(temperature_gradients)
 
     plt.figure()
     plt.plot(temperature_gradients, teg_voltages, label='TEG Voltage (mV)')
@@ -1,6 +1,14 @@
+import os
+import tempfile
 import unittest
+import numpy as np
 import simulation
+import converter_model
 import harvested_energy_estimation
+import battery_charge_discharge
+import optimal_gradient
+import scenario_sweep
+import gradient_trace_simulation
 
 '''
 This script contains test cases for the ThermoBeat system simulation and harvested energy estimation functions. It tests the teg_output, ltc3108_output, and energy_harvested functions using sample input data, and checks whether the output values match the expected values within a certain tolerance.
@@ -11,7 +19,7 @@ python -m unittest test_thermobeat.py
 If all tests pass, you should see output similar to the following:
 ...
 ----------------------------------------------------------------------
-Ran 3 tests in 0.001s
+Ran 10 tests in 0.001s
 
 OK
 '''
@@ -40,6 +48,23 @@ class TestThermoBeat(unittest.TestCase):
         self.assertAlmostEqual(output_voltage, expected_voltage, places=0)
         self.assertAlmostEqual(output_current, expected_current, places=1)
 
+    def test_simulate_harvest_matches_scalar_chain(self):
+        temperature_gradients = np.linspace(1, 10, 10)[:, None]
+        E1 = np.array([50.4, 25.2])
+        I1max = 3.11
+
+        results = simulation.simulate_harvest(temperature_gradients, E1, I1max, duration=2.0)
+        self.assertEqual(results.shape, (10, 2))
+
+        for i, gradient in enumerate(temperature_gradients[:, 0]):
+            for j, voltage_per_gradient in enumerate(E1):
+                input_voltage, input_current = simulation.teg_output(gradient, voltage_per_gradient, I1max)
+                output_voltage, output_current = simulation.ltc3108_output(input_voltage, input_current)
+
+                self.assertAlmostEqual(results['input_voltage'][i, j], input_voltage)
+                self.assertAlmostEqual(results['output_current'][i, j], output_current)
+                self.assertAlmostEqual(results['energy'][i, j], output_voltage * output_current * 2.0)
+
     def test_energy_harvested(self):
         temperature_gradient = 3.0
         duration = 2.0
@@ -51,5 +76,145 @@ class TestThermoBeat(unittest.TestCase):
 
         self.assertAlmostEqual(energy, expected_energy, places=0)
 
+    def test_battery_events_hit_full_and_empty(self):
+        event_times, event_energies = battery_charge_discharge.simulate_battery_events([0, 10, 20], [0, 500, 0], 100, 1000, 500, 40)
+
+        np.testing.assert_allclose(event_times, [0, 5, 10, 12.5, 20, 30, 40])
+        np.testing.assert_allclose(event_energies, [500, 0, 0, 1000, 1000, 0, 0])
+
+        history = battery_charge_discharge.sample_battery_history(event_times, event_energies, [2.5, 11, 25])
+        np.testing.assert_allclose(history, [250, 400, 500])
+
+    def test_update_battery_levels_matches_clamped_steps(self):
+        net_energy = np.array([50, -300, -100, 80, 400, -20, -900, 10])
+        capacity = 500
+
+        battery_energy = 450
+        expected_levels = []
+        for step in net_energy:
+            battery_energy = min(max(battery_energy + step, 0), capacity)
+            expected_levels.append(battery_energy)
+
+        levels = battery_charge_discharge.update_battery_levels(450, net_energy, capacity)
+        np.testing.assert_allclose(levels, expected_levels)
+
+    def test_required_gradient_inverts_harvest_chain(self):
+        device_power_consumptions = np.array([50, 300, 1e9])
+
+        closed_form = optimal_gradient.solve_required_gradient(device_power_consumptions)
+        table_model = simulation.DEFAULT_MODEL.replace(efficiency=lambda voltage, power: np.full_like(power, 0.8))
+        bisection = optimal_gradient.solve_required_gradient(device_power_consumptions, model=table_model)
+
+        np.testing.assert_allclose(closed_form[:2], bisection[:2], atol=1e-8)
+        self.assertTrue(np.isnan(closed_form[2]) and np.isnan(bisection[2]))
+
+        harvested_power = simulation.simulate_harvest(closed_form[:2], 50.4, 3.11)['output_power']
+        np.testing.assert_allclose(harvested_power, device_power_consumptions[:2])
+
+    def test_efficiency_table_interpolates_and_reloads_on_change(self):
+        with tempfile.TemporaryDirectory() as directory:
+            table_path = os.path.join(directory, 'ltc3108_efficiency.csv')
+            with open(table_path, 'w') as fid:
+                fid.write('input_voltage_mV,input_power_mW,efficiency\n20,1,0.2\n20,10,0.3\n100,1,0.5\n100,10,0.7\n')
+
+            table = converter_model.load_efficiency_table(table_path)
+            np.testing.assert_allclose(table([20, 60, 500], [1, 5.5, 10]), [0.2, 0.425, 0.7])
+            self.assertIs(converter_model.load_efficiency_table(table_path), table)
+
+            os.utime(table_path, ns=(0, 0))
+            self.assertIsNot(converter_model.load_efficiency_table(table_path), table)
+
+    def test_harvester_model_matches_chain(self):
+        model = simulation.HarvesterModel(50.4, 3.11)
+        temperature_gradients = np.array([0.5, 3.0, 7.5])
+
+        results = simulation.simulate_harvest(temperature_gradients, 50.4, 3.11)
+        np.testing.assert_allclose(model.output_power_array(temperature_gradients), results['output_power'])
+        np.testing.assert_allclose(model.output_current_array(temperature_gradients), results['output_current'])
+        self.assertAlmostEqual(model.output(3.0)[1], simulation.ltc3108_output(*simulation.teg_output(3.0, 50.4, 3.11))[1])
+
+        volts_model = model.replace(output_voltage_unit='V')
+        self.assertAlmostEqual(volts_model.output(3.0)[0], 3.3)
+        self.assertAlmostEqual(volts_model.output(3.0)[1], model.output_power(3.0) / 3.3)
+
+        with self.assertRaises(AttributeError):
+            model.efficiency = 0.9
+
+    def test_scenario_sweep_does_not_depend_on_num_workers(self):
+        distributions = {
+            "efficiency": ("uniform", 0.6, 0.85),
+            "device_power_consumption_mW": ("lognormal", np.log(336), 0.25),
+        }
+
+        serial = scenario_sweep.run_scenario_sweep(distributions, 1000, temperature_gradient=0.5, chunk_size=100, num_workers=1, seed=7)
+        parallel = scenario_sweep.run_scenario_sweep(distributions, 1000, temperature_gradient=0.5, chunk_size=100, num_workers=2, seed=7)
+        self.assertEqual(serial, parallel)
+
+    def test_gradient_trace_carries_battery_across_chunks(self):
+        rng = np.random.default_rng(3)
+        times = np.cumsum(rng.uniform(0.01, 0.05, 50))
+        gradients = rng.uniform(0, 2, 50)
+
+        def simulate(chunk_size):
+            chunks = [(times[i:i + chunk_size], gradients[i:i + chunk_size]) for i in range(0, len(times), chunk_size)]
+            results = list(gradient_trace_simulation.simulate_gradient_trace(chunks, 1, 3.7, 200))
+            return [np.concatenate(arrays) for arrays in zip(*results)]
+
+        expected_times, expected_power, expected_levels = simulate(len(times))
+        chunked_times, chunked_power, chunked_levels = simulate(7)
+        np.testing.assert_allclose(chunked_times, expected_times)
+        np.testing.assert_allclose(chunked_power, expected_power)
+        np.testing.assert_allclose(chunked_levels, expected_levels)
+
+        # Each sample's power is held until the next sample, with the battery clamped after every step.
+        battery_energy = 3.7
+        step_levels = [battery_energy]
+        for i in range(1, len(times)):
+            battery_energy = min(max(battery_energy + (expected_power[i - 1] - 200) * (times[i] - times[i - 1]), 0), 3.7)
+            step_levels.append(battery_energy)
+        np.testing.assert_allclose(chunked_levels, step_levels)
+        self.assertTrue(np.any(chunked_levels == 0) and np.any(chunked_levels[1:] == 3.7))
+
+    def test_gradient_trace_readers_agree(self):
+        times = np.linspace(0, 1, 9)
+        skin = np.linspace(33, 35, 9)
+        ambient = np.linspace(20, 30, 9)
+
+        def read(path, **column_kwargs):
+            chunks = list(gradient_trace_simulation.read_gradient_chunks(path, chunk_size=4, **column_kwargs))
+            self.assertEqual(len(chunks), 3)
+            return [np.concatenate(arrays) for arrays in zip(*chunks)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, 'trace.csv')
+            with open(csv_path, 'w') as fid:
+                fid.write('time_hours,temperature_gradient,skin,ambient\n')
+                for row in zip(times, skin - ambient, skin, ambient):
+                    fid.write(','.join(repr(float(v)) for v in row) + '\n')
+
+            structured = np.zeros(9, dtype=[('t', 'f8'), ('skin', 'f4'), ('ambient', 'f4')])
+            structured['t'], structured['skin'], structured['ambient'] = times, skin, ambient
+            structured_path = os.path.join(directory, 'structured.npy')
+            np.save(structured_path, structured)
+
+            gradient_path = os.path.join(directory, 'gradient.npy')
+            np.save(gradient_path, np.column_stack([times, skin - ambient]))
+            temperatures_path = os.path.join(directory, 'temperatures.npy')
+            np.save(temperatures_path, np.column_stack([times, skin, ambient]))
+
+            traces = [
+                read(csv_path),
+                read(csv_path, skin_column='skin', ambient_column='ambient'),
+                read(structured_path, time_column='t', skin_column='skin', ambient_column='ambient'),
+                read(gradient_path),
+                read(temperatures_path),
+            ]
+            for trace_times, trace_gradients in traces:
+                np.testing.assert_allclose(trace_times, times)
+                np.testing.assert_allclose(trace_gradients, skin - ambient, rtol=1e-6)
+
+            with self.assertRaises(ValueError):
+                read(temperatures_path, skin_column='skin', ambient_column='ambient')
+
 if __name__ == '__main__':
     unittest.main()
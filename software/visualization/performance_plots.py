@@ -18,13 +18,7 @@ Two windows with the performance plots should appear, showing the relationship b
 
 def plot_teg_output_vs_temperature_gradient():
     temperature_gradients = np.linspace(1, 10, 100)
-    output_voltages = []
-    output_currents = []
-
-    for temperature_gradient in temperature_gradients:
-        output_voltage, output_current = simulation.teg_output(temperature_gradient, 50.4, 3.11)
-        output_voltages.append(output_voltage)
-        output_currents.append(output_current)
+    output_voltages, output_currents = simulation.DEFAULT_MODEL.teg_output(temperature_gradients)
 
     plt.plot(temperature_gradients, output_voltages, label="Output Voltage (mV)")
     plt.plot(temperature_gradients, output_currents, label="Output Current (mA)")
@@ -40,8 +34,7 @@ def plot_energy_harvested_vs_duration():
     durations = np.linspace(1, 10, 100)
     energies = []
 
-    output_voltage, output_current = simulation.teg_output(temperature_gradient, 50.4, 3.11)
-    output_voltage, output_current = simulation.ltc3108_output(output_voltage, output_current)
+    output_voltage, output_current = simulation.DEFAULT_MODEL.output(temperature_gradient)
 
     for duration in durations:
         energy = harvested_energy_estimation.energy_harvested(temperature_gradient, duration, output_voltage, output_current)